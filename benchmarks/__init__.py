@@ -0,0 +1,6 @@
+'''
+Benchmarks of the library system hot paths.
+
+Run a benchmark from the project root, e.g.:
+    python -m benchmarks.bench_dates
+'''
@@ -0,0 +1,95 @@
+'''
+Benchmark of the dates parsing: `parse_date` against `dateutil.parser.parse(value, dayfirst=True)`
+on the due dates of a generated `borrowed` worksheet, parsed one by one and sorted with `sort_data`.
+
+Usage:
+    python -m benchmarks.bench_dates [--rows 100000] [--repeat 3]
+'''
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from dateutil.parser import parse
+from dateutil.parser import ParserError
+
+from library_system.models.dates import parse_date, format_date, _parse_date
+from library_system.models.spreadsheet import sort_data
+from library_system.models.book import BorrowFields
+
+
+def make_dates(rows: int, seed: int = 42) -> list[str]:
+    '''
+    Generate due dates in the `dd-mm-yyyy` format within two years, with a few invalid values.
+    '''
+    rnd = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    dates = [format_date(start + timedelta(days=rnd.randrange(730))) for _ in range(rows)]
+    for i in range(0, rows, 1000):
+        dates[i] = 'not a date'
+    return dates
+
+
+def dateutil_parse(value: str) -> datetime:
+    '''
+    The dates parsing used before `parse_date`.
+    '''
+    try:
+        return parse(value, dayfirst=True)
+    except (ParserError, OverflowError) as e:
+        raise ValueError(e)
+
+
+def bench(name: str, func, repeat: int) -> float:
+    '''
+    Run the function `repeat` times, print and return the best wall time.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        _parse_date.cache_clear()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f'{name:<40} {best * 1000:10.1f} ms')
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the dates parsing.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    dates = make_dates(args.rows)
+    records = [{BorrowFields.due_date.name: date} for date in dates]
+    print(f'{args.rows} due dates, {len(set(dates))} unique, best of {args.repeat}')
+
+    def parse_all(parser):
+        def run():
+            for date in dates:
+                try:
+                    parser(date)
+                except ValueError:
+                    pass
+        return run
+
+    def sort_with(parser):
+        def run():
+            def sort_date(d):
+                try:
+                    return parser(d[BorrowFields.due_date.name])
+                except ValueError:
+                    return datetime.max
+            sorted(records, key=sort_date)
+        return run
+
+    old = bench('parse: dateutil', parse_all(dateutil_parse), args.repeat)
+    new = bench('parse: parse_date', parse_all(parse_date), args.repeat)
+    print(f'{"":<40} {old / new:10.1f} x')
+    old = bench('sort by due date: dateutil', sort_with(dateutil_parse), args.repeat)
+    new = bench('sort by due date: sort_data', lambda: sort_data(BorrowFields.due_date.name, records), args.repeat)
+    print(f'{"":<40} {old / new:10.1f} x')
+
+
+if __name__ == '__main__':
+    main()
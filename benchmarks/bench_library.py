@@ -0,0 +1,320 @@
+'''
+Benchmark of the `Library` operations on a fake Google Spreadsheet (`benchmarks.fake_gspread`).
+
+For each catalogue size a `stock` worksheet with the number of books and a `borrowed` worksheet
+with a tenth of that number of loans are generated. Each operation is run `--repeat` times on different books
+and the median wall time, the mean number of the API calls and the peak memory (by `tracemalloc`,
+measured in one more run) are reported.
+By default the worksheets snapshots are cached before the operation, `--cold` drops them,
+so every operation downloads the worksheets it reads.
+With the warm cache the benchmark fails if a write operation makes more API calls than `MAX_API_CALLS`.
+
+Save the results and compare the next runs with them:
+    python -m benchmarks.bench_library --sizes 1k 100k --save baseline.json
+    python -m benchmarks.bench_library --sizes 1k 100k --compare baseline.json
+
+Usage:
+    python -m benchmarks.bench_library [--sizes 1k 100k 1m] [--repeat 5] [--latency 0.05] [--cold]
+                                       [--save FILE] [--compare FILE]
+'''
+import argparse
+import gc
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, NamedTuple
+
+from benchmarks.fake_gspread import FakeSpreadsheet
+from library_system.models.book import Book, BookFields, BorrowFields
+from library_system.models.dates import format_date
+from library_system.models.scheduler import RequestScheduler
+from library_system.models.spreadsheet import Library
+from library_system.models.storage import StorageKinds
+from library_system.models.worksheets_cfg import WorksheetSets, worksheet_headers
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+GENRES = ['Fiction', 'Poetry', 'History', 'Science', 'Computers', 'Travel', 'Art', 'Biography', 'Drama', 'Music']
+# the snapshots don't expire during a benchmark, even on the largest catalogue
+CACHE_TTL = 24 * 60 * 60
+# quotas high enough for the scheduler never to delay the requests
+NO_QUOTA = 10 ** 9
+# most API calls of the write operations with the warm cache: all the writes are sent in one batch request
+MAX_API_CALLS = {
+    'add_book_copies': 1,
+    'append_book': 1,
+    'remove_book': 1,
+    'check_out_book': 1,
+    'return_book': 1,
+}
+
+
+class Result(NamedTuple):
+    '''
+    :param time: median wall time of the operation in seconds
+    :param calls: mean number of the API calls of the operation
+    :param peak: peak memory allocated by the operation in bytes
+    '''
+    time: float
+    calls: float
+    peak: int
+
+
+def isbn(number: int) -> str:
+    return str(9780000000000 + number)
+
+
+def make_stock(books: int, seed: int = 42) -> list[list[str]]:
+    '''
+    Generate the `stock` worksheet rows: the header and a book per row.
+    '''
+    rnd = random.Random(seed)
+    authors = [f'Author {i}' for i in range(max(1, books // 10))]
+    rows = [worksheet_headers(WorksheetSets.stock.value)]
+    rows += [
+        [isbn(i), f'Title {i}', rnd.choice(authors), rnd.choice(GENRES), str(rnd.randint(1900, 2023)),
+         str(rnd.randint(3, 20)), f'{i:016x}']
+        for i in range(books)
+    ]
+    return rows
+
+
+def make_borrowed(stock: list[list[str]], loans: int, seed: int = 42) -> list[list[str]]:
+    '''
+    Generate the `borrowed` worksheet rows: the header and a loan of a stock book per row,
+    due within a year before or after today.
+    '''
+    rnd = random.Random(seed)
+    today = datetime.today()
+    rows = [worksheet_headers(WorksheetSets.borrowed.value)]
+    for i in range(loans):
+        book = stock[1 + i % (len(stock) - 1)]
+        due_date = today + timedelta(days=rnd.randint(-365, 365))
+        rows.append(book[:5] + [
+            f'Borrower {i}', format_date(due_date - timedelta(days=14)), format_date(due_date), f'{i:016x}'
+        ])
+    return rows
+
+
+@contextmanager
+def open_library(books: int, latency: float) -> Iterator[Library]:
+    '''
+    Open the `Library` on a fake spreadsheet with the generated worksheets.
+    The worksheets are switched to the Google Sheets backend while the block runs.
+    '''
+    spreadsheet = FakeSpreadsheet(latency)
+    stock = make_stock(books)
+    spreadsheet.load(WorksheetSets.stock.value['title'], stock)
+    spreadsheet.load(WorksheetSets.borrowed.value['title'], make_borrowed(stock, max(1, books // 10)))
+    library = Library('benchmark', 'creds.json', cache_ttl=CACHE_TTL)
+    library.s_sheet = spreadsheet  # type: ignore[assignment]
+    library.isConnected = True
+    library.scheduler = RequestScheduler(NO_QUOTA, NO_QUOTA, burst=NO_QUOTA)
+    backends = {w_set: w_set.value['backend'] for w_set in WorksheetSets}
+    try:
+        for w_set in WorksheetSets:
+            w_set.value['backend'] = StorageKinds.gsheet
+        library.set_worksheets(list(WorksheetSets))
+        yield library
+    finally:
+        for w_set, backend in backends.items():
+            w_set.value['backend'] = backend
+
+
+def find(library: Library, value: str, field: BookFields | BorrowFields, w_set) -> dict:
+    return library.search_books(value, field, w_set.value)[0]
+
+
+def operations(books: int) -> dict[str, Callable[[Library, int], Callable[[], object]]]:
+    '''
+    Get the benchmarked operations by name.
+    Each operation prepares its arguments for the run `i` and returns the function to time,
+    the runs use different books, as the operations change them.
+    '''
+    stock = WorksheetSets.stock
+    borrowed = WorksheetSets.borrowed
+
+    def stock_isbn(i: int) -> str:
+        # spread the books over the worksheet
+        return isbn((i * 7919) % books)
+
+    def search_isbn(library, i):
+        return lambda: library.search_books(stock_isbn(i), BookFields.isbn, stock.value)
+
+    def search_title(library, i):
+        return lambda: library.search_books(f'Title {i}', BookFields.title, stock.value)
+
+    def search_year(library, i):
+        # the validated year is an int
+        return lambda: library.search_books(1900 + i, BookFields.year, stock.value)
+
+    def add_book_copies(library, i):
+        book = find(library, stock_isbn(i), BookFields.isbn, stock)
+        return lambda: library.add_book_copies(book, stock.value, 1)
+
+    def append_book(library, i):
+        book = Book(isbn=isbn(books + i), title=f'New title {i}', author='New author', genre='Fiction',
+                    year=2023, copies=1)
+        return lambda: library.append_book(book, stock.value)
+
+    def remove_book(library, i):
+        book = find(library, stock_isbn(i + 100), BookFields.isbn, stock)
+        return lambda: library.remove_book(book, stock.value, 1)
+
+    def check_out_book(library, i):
+        today = datetime.today()
+        book = find(library, stock_isbn(i + 200), BookFields.isbn, stock) | {
+            BorrowFields.borrower_name.name: f'New borrower {i}',
+            BorrowFields.borrow_date.name: format_date(today),
+            BorrowFields.due_date.name: format_date(today + timedelta(days=14)),
+        }
+        return lambda: library.check_out_book(book)
+
+    def return_book(library, i):
+        loan = find(library, f'Borrower {i}', BorrowFields.borrower_name, borrowed)
+        return lambda: library.return_book(loan)
+
+    def get_overdue_borrowers(library, i):
+        return lambda: library.get_overdue_borrowers()
+
+    def get_library_stock(library, i):
+        return lambda: library.get_library_stock(stock.value)
+
+    def get_library_stock_sorted(library, i):
+        return lambda: library.get_library_stock(stock.value, [BookFields.genre, BookFields.author])
+
+    return {
+        'search_books (isbn)': search_isbn,
+        'search_books (title)': search_title,
+        'search_books (year)': search_year,
+        'add_book_copies': add_book_copies,
+        'append_book': append_book,
+        'remove_book': remove_book,
+        'check_out_book': check_out_book,
+        'return_book': return_book,
+        'get_overdue_borrowers': get_overdue_borrowers,
+        'get_library_stock': get_library_stock,
+        'get_library_stock (sorted)': get_library_stock_sorted,
+    }
+
+
+def bench(library: Library, prepare: Callable[[Library, int], Callable[[], object]], repeat: int,
+          cold: bool) -> Result:
+    '''
+    Run the operation `repeat` times to get its median wall time and mean number of the API calls,
+    then once more with `tracemalloc` to get its peak memory.
+    '''
+    spreadsheet: FakeSpreadsheet = library.s_sheet  # type: ignore[assignment]
+    times = []
+    calls = []
+    peak = 0
+    for i in range(repeat + 1):
+        run = prepare(library, i)
+        if cold:
+            library.invalidate_snapshots()
+        else:
+            for w_set in WorksheetSets:
+                library.get_snapshot(w_set.value)
+        gc.collect()
+        calls_before = sum(spreadsheet.calls.values())
+        if i < repeat:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+            calls.append(sum(spreadsheet.calls.values()) - calls_before)
+        else:
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return Result(statistics.median(times), statistics.mean(calls), peak)
+
+
+def compare(value: float, baseline: float | None) -> str:
+    '''
+    Format the change of the value against the baseline in percent.
+    '''
+    if baseline is None:
+        return ''
+    if not baseline:
+        return '-' if not value else 'new'
+    return f'{(value - baseline) / baseline * 100:+.0f}%'
+
+
+def print_results(results: dict[str, Result], baseline: dict[str, dict] | None) -> None:
+    header = f'{"operation":<28}{"time ms":>10}{"":>9}{"API calls":>11}{"":>9}{"peak KiB":>11}{"":>9}'
+    print(header)
+    for name, result in results.items():
+        old = (baseline or {}).get(name)
+        old_time, old_calls, old_peak = (old['time'], old['calls'], old['peak']) if old else (None, None, None)
+        print(
+            f'{name:<28}{result.time * 1000:10.2f}{compare(result.time, old_time):>9}'
+            f'{result.calls:11.1f}{compare(result.calls, old_calls):>9}'
+            f'{result.peak / 1024:11.1f}{compare(result.peak, old_peak):>9}'
+        )
+
+
+def check_api_calls(results: dict[str, Result]) -> list[str]:
+    '''
+    Get the operations making more API calls than `MAX_API_CALLS`.
+    '''
+    return [
+        f'{name}: {results[name].calls:.1f} API calls, expected at most {max_calls}'
+        for name, max_calls in MAX_API_CALLS.items() if name in results and results[name].calls > max_calls
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the Library operations on a fake Google Spreadsheet.')
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=['1k', '100k'],
+                        help='numbers of the books in the stock worksheet')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds each API call takes')
+    parser.add_argument('--cold', action='store_true', help='drop the cached snapshots before each operation')
+    parser.add_argument('--save', metavar='FILE', help='save the results to the JSON file')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with the saved JSON file')
+    args = parser.parse_args(argv)
+
+    settings = {'repeat': args.repeat, 'latency': args.latency, 'cold': args.cold}
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            saved = json.load(file)
+        if saved['settings'] != settings:
+            print(f'The baseline was run with other settings: {saved["settings"]}')
+        baseline = saved['results']
+
+    results: dict[str, dict] = {}
+    failures: list[str] = []
+    for size in args.sizes:
+        books = SIZES[size]
+        start = time.perf_counter()
+        with open_library(books, args.latency) as library:
+            print(
+                f'\n{books} books, {max(1, books // 10)} loans, {args.latency * 1000:.0f} ms latency, '
+                f'{"cold" if args.cold else "warm"} cache, median of {args.repeat} '
+                f'(set up in {time.perf_counter() - start:.1f}s)'
+            )
+            size_results = {
+                name: bench(library, prepare, args.repeat, args.cold) for name, prepare in operations(books).items()
+            }
+        print_results(size_results, (baseline or {}).get(size))
+        if not args.cold:
+            failures += [f'{size} {failure}' for failure in check_api_calls(size_results)]
+        results[size] = {name: result._asdict() for name, result in size_results.items()}
+        del library
+        gc.collect()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({'settings': settings, 'results': results}, file, indent=2)
+        print(f'\nResults saved to {args.save}')
+    if failures:
+        raise SystemExit('\n' + '\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main()
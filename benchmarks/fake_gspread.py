@@ -0,0 +1,275 @@
+'''
+Local fake of the gspread `Spreadsheet` and `Worksheet` for the benchmarks.
+
+Implements the requests made by `GSheetStorage` and `GSheetWorksheet` on in-memory rows,
+counts them by method in `FakeSpreadsheet.calls` and sleeps `latency` seconds on each of them,
+so the benchmarks show the number of the API calls of an operation and their cost.
+As the API does, the range reads leave out the trailing empty rows and cells
+and a `batch_update` is applied fully or not at all.
+'''
+import time
+from collections import Counter
+
+
+def parse_range(range_name: str) -> tuple[str, str]:
+    '''
+    Split the absolute range name, e.g. `'stock'!1:1`, into the worksheet title and the range.
+    '''
+    title, _, cells = range_name.rpartition('!')
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, cells
+
+
+def cell_value(cell_data: dict) -> str:
+    '''
+    Get the value of the Sheets API `CellData` as it would be read back.
+    '''
+    value = cell_data.get('userEnteredValue')
+    if not value:
+        return ''
+    value = next(iter(value.values()))
+    if isinstance(value, bool):
+        return str(value).upper()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+class FakeWorksheet:
+    '''
+    Fake gspread `Worksheet`.
+
+    :param spreadsheet: `FakeSpreadsheet` of the worksheet
+    :param title: worksheet title
+    :param sheet_id: worksheet id
+    :param rows: number of the rows of the grid
+    :param cols: number of the columns of the grid
+    '''
+
+    def __init__(self, spreadsheet: 'FakeSpreadsheet', title: str, sheet_id: int, rows: int, cols: int) -> None:
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.row_count = rows
+        self.col_count = cols
+        self.rows: list[list[str]] = []
+
+    def _last_row(self) -> int:
+        '''
+        Get the number of the last row with a value, the API doesn't return the empty rows below it.
+        '''
+        end = len(self.rows)
+        while end and not any(self.rows[end - 1]):
+            end -= 1
+        return end
+
+    def add_row(self, values: list[str]) -> None:
+        '''
+        Append the row after the last row with a value, the grid grows if the row is out of it.
+        '''
+        del self.rows[self._last_row():]
+        self.rows.append(values)
+        self.row_count = max(self.row_count, len(self.rows))
+
+    def remove_rows(self, start: int, end: int) -> None:
+        '''
+        Delete the rows from `start` to `end` (excluded) counted from 0, the grid shrinks.
+        '''
+        self.row_count -= max(0, min(end, self.row_count) - start)
+        del self.rows[start:end]
+
+    def set_cell(self, row: int, col: int, value: str) -> None:
+        while len(self.rows) < row:
+            self.rows.append([])
+        self.row_count = max(self.row_count, len(self.rows))
+        # the row is replaced, not changed in place, so the rows kept to undo a batch stay as they were
+        cells = list(self.rows[row - 1])
+        if len(cells) < col:
+            cells.extend([''] * (col - len(cells)))
+        cells[col - 1] = value
+        self.rows[row - 1] = cells
+
+    def get_all_values(self) -> list[list[str]]:
+        self.spreadsheet.request('get_all_values')
+        rows = self.rows[:self._last_row()]
+        width = max(map(len, rows), default=0)
+        # the rows are copied as they would be decoded from the response
+        return [row + [''] * (width - len(row)) for row in rows]
+
+    def row_values(self, row: int) -> list[str]:
+        self.spreadsheet.request('row_values')
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def get(self, range_name: str) -> list[list[str]]:
+        from library_system.models.storage import trim_row
+
+        self.spreadsheet.request('get')
+        start, _, end = range_name.partition(':')
+        rows = self.rows[int(start) - 1:int(end)]
+        # the API doesn't return the trailing empty rows and cells of the range
+        while rows and not any(rows[-1]):
+            rows = rows[:-1]
+        return [trim_row(list(row)) for row in rows]
+
+    def update_cell(self, row: int, col: int, value) -> None:
+        self.spreadsheet.request('update_cell')
+        self.set_cell(row, col, '' if value is None else str(value))
+
+    def append_row(self, values: list, **kwargs) -> None:
+        self.spreadsheet.request('append_row')
+        self.add_row(['' if value is None else str(value) for value in values])
+
+    def batch_clear(self, ranges: list[str]) -> None:
+        self.spreadsheet.request('batch_clear')
+        for range_name in ranges:
+            start, _, end = range_name.partition(':')
+            for row in range(int(start), min(int(end), len(self.rows)) + 1):
+                self.rows[row - 1] = []
+
+    def delete_row(self, row: int) -> None:
+        self.spreadsheet.request('delete_row')
+        self.remove_rows(row - 1, row)
+
+
+class FakeSpreadsheet:
+    '''
+    Fake gspread `Spreadsheet`.
+
+    :param latency: number of seconds each request takes
+    :param `calls`: number of the requests by method name
+    '''
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._worksheets: dict[str, FakeWorksheet] = {}
+
+    def request(self, method: str) -> None:
+        '''
+        Count the request and wait for its latency.
+        '''
+        self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def load(self, title: str, rows: list[list[str]]) -> FakeWorksheet:
+        '''
+        Create the worksheet with the rows, without counting a request.
+        '''
+        worksheet = FakeWorksheet(self, title, len(self._worksheets), len(rows), max(map(len, rows), default=1))
+        worksheet.rows = rows
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def worksheets(self) -> list[FakeWorksheet]:
+        self.request('worksheets')
+        return list(self._worksheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.request('worksheet')
+        return self._worksheets[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.request('add_worksheet')
+        worksheet = FakeWorksheet(self, title, len(self._worksheets), rows, cols)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def fetch_sheet_metadata(self, params: dict | None = None) -> dict:
+        self.request('fetch_sheet_metadata')
+        return {'sheets': [
+            {'properties': {
+                'sheetId': worksheet.id, 'title': worksheet.title,
+                'gridProperties': {'rowCount': worksheet.row_count, 'columnCount': worksheet.col_count},
+            }}
+            for worksheet in self._worksheets.values()
+        ]}
+
+    def values_batch_get(self, ranges: list[str]) -> dict:
+        self.request('values_batch_get')
+        value_ranges = []
+        for range_name in ranges:
+            title, _ = parse_range(range_name)
+            rows = self._worksheets[title].rows
+            value_ranges.append({'range': range_name, 'values': [list(rows[0])]} if rows else {'range': range_name})
+        return {'valueRanges': value_ranges}
+
+    def values_batch_update(self, params: dict | None = None, body: dict | None = None) -> dict:
+        self.request('values_batch_update')
+        for data in (body or {}).get('data', []):
+            title, _ = parse_range(data['range'])
+            worksheet = self._worksheets[title]
+            if len(data['values'][0]) > worksheet.col_count:
+                raise ValueError(f'Range <{data["range"]}> exceeds the grid of the worksheet <{title}>')
+            for col, value in enumerate(data['values'][0], start=1):
+                worksheet.set_cell(1, col, '' if value is None else str(value))
+        return {}
+
+    def batch_update(self, body: dict) -> dict:
+        '''
+        Apply the requests in order. As the API does, the batch is atomic:
+        if a request fails, the rows and the grids changed by the previous requests are restored.
+        '''
+        self.request('batch_update')
+        by_id = {worksheet.id: worksheet for worksheet in self._worksheets.values()}
+        # worksheet, first row, end row of the changed rows and their values, grid size before each request
+        undo: list[tuple[FakeWorksheet, int, int, list[list[str]], tuple[int, int]]] = []
+        try:
+            for request in body['requests']:
+                (kind, params), = request.items()
+                worksheet, start, end = self._changed_rows(kind, params, by_id)
+                length = len(worksheet.rows)
+                grid = (worksheet.row_count, worksheet.col_count)
+                saved = worksheet.rows[start:end]
+                self._apply(kind, params, worksheet)
+                undo.append((worksheet, start, end + len(worksheet.rows) - length, saved, grid))
+        except Exception:
+            for worksheet, start, end, saved, (rows, cols) in reversed(undo):
+                worksheet.rows[start:end] = saved
+                worksheet.row_count, worksheet.col_count = rows, cols
+            raise
+        return {}
+
+    @staticmethod
+    def _changed_rows(kind: str, params: dict, by_id: dict[int, FakeWorksheet]) -> tuple[FakeWorksheet, int, int]:
+        '''
+        Get the worksheet of the request and the range of its rows (counted from 0) the request changes.
+        '''
+        if kind == 'updateCells':
+            cells = params['range']
+            worksheet = by_id[cells['sheetId']]
+            end = cells['startRowIndex'] + 1 if 'rows' in params else cells['endRowIndex']
+            return worksheet, min(cells['startRowIndex'], len(worksheet.rows)), min(end, len(worksheet.rows))
+        if kind == 'appendCells':
+            worksheet = by_id[params['sheetId']]
+            return worksheet, worksheet._last_row(), len(worksheet.rows)
+        if kind == 'appendDimension':
+            return by_id[params['sheetId']], 0, 0
+        if kind == 'deleteDimension':
+            rows = params['range']
+            worksheet = by_id[rows['sheetId']]
+            return worksheet, min(rows['startIndex'], len(worksheet.rows)), min(rows['endIndex'], len(worksheet.rows))
+        raise ValueError(f'Unknown request <{kind}>')
+
+    @staticmethod
+    def _apply(kind: str, params: dict, worksheet: FakeWorksheet) -> None:
+        if kind == 'updateCells':
+            cells = params['range']
+            if 'rows' not in params:
+                # no data clears the range
+                for row in range(cells['startRowIndex'], min(cells['endRowIndex'], len(worksheet.rows))):
+                    worksheet.rows[row] = []
+            elif cells['startColumnIndex'] >= worksheet.col_count:
+                raise ValueError(f'Range exceeds the grid of the worksheet <{worksheet.title}>')
+            else:
+                worksheet.set_cell(
+                    cells['startRowIndex'] + 1, cells['startColumnIndex'] + 1,
+                    cell_value(params['rows'][0]['values'][0])
+                )
+        elif kind == 'appendCells':
+            worksheet.add_row([cell_value(cell) for cell in params['rows'][0]['values']])
+        elif kind == 'appendDimension':
+            worksheet.col_count += params['length']
+        elif kind == 'deleteDimension':
+            worksheet.remove_rows(params['range']['startIndex'], params['range']['endIndex'])
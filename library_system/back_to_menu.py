@@ -1,40 +1,38 @@
 import sys
 import time
+from enum import Enum
 
-from library_system.models.spreadsheet import Library
-from library_system.views.console_ui import Menu
-from library_system.views.menus import MenuSets
-from library_system import library_manager
-from library_system.tools import F, clear_terminal
+from library_system.tools import F, clear_terminal, is_connection_error
 
 
-def run_main_menu():
+class Navigation(Enum):
     '''
-    Displays the options available in the Library Main Menu
-    using the tabulate library.
-    :return: selected option name
+    The next step of the menu loop returned by the library manager functions:
+    - `main_menu`: wait for the user input and display the Main Menu;
+    - `repeat`: run the selected option again, e.g. if no books were found;
+    - `restart`: run the selected option again after a failed request;
+    - `reconnect`: reconnect the Library and run the selected option again after a connection or auth error.
     '''
-    menu = Menu(**MenuSets.main_menu.value)
-    menu.run()
-    selected = menu.get_selected_option_str()
+    main_menu = 'main_menu'
+    repeat = 'repeat'
+    restart = 'restart'
+    reconnect = 'reconnect'
 
-    return selected
 
-
-def run_selected_option(library: Library, selected_option: str):
+def restart_after(error: Exception) -> Navigation:
     '''
-    Execute the function using the function name based on the user selection.
-    :param library: Library instance
-    :param selected_option: selected option name
+    Get the next step of the menu loop after the failed request of the selected option:
+    the Library is reconnected only if the connection or the authorization failed, see `is_connection_error`.
+
+    :param error: the exception of the failed request
     '''
-    func_name = selected_option.replace(' ', '_')
-    getattr(library_manager, func_name)(library)
+    return Navigation.reconnect if is_connection_error(error) else Navigation.restart
 
 
-# entry point for the startup functionality
-def back_to_menu(library: Library):
+def back_to_menu():
     '''
-    Go back to the main menu after user input.
+    Wait for the user input before going back to the main menu.
+    Exit the app on Ctrl+C.
     '''
     print(f'{F.ITALIC}Enter any key to go back to the main menu or Ctrl+C to exit.{F.ENDC}')
 
@@ -50,5 +48,3 @@ def back_to_menu(library: Library):
         print(f'{F.YELLOW}Back to the main menu...{F.ENDC}')
         time.sleep(1)
         clear_terminal()
-        selected_option = run_main_menu()
-        run_selected_option(library, selected_option)
@@ -0,0 +1,192 @@
+'''
+Bulk import of books to the library stock from a CSV or JSONL file.
+
+The file is read row by row, each row is validated with the `Book` model.
+Books with an ISBN that already exists in the stock get their copies added,
+new books are appended. The writes are sent in batches by the `Library` write buffer.
+The stock is read once without caching its snapshot, only the row and the number of copies of each ISBN are kept,
+so the memory used grows with the number of distinct books, not with the size of the imported file.
+
+Usage:
+    python -m library_system.bulk_import books.csv --rejects rejects.jsonl
+'''
+import argparse
+import csv
+import json
+import logging
+import sys
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+from pydantic import ValidationError
+
+from library_system.models.spreadsheet import Library
+from library_system.models.scheduler import Priority
+from library_system.models.metrics import measured
+from library_system.models.book import Book, BookFields
+from library_system.models.worksheets_cfg import WorksheetSets
+
+logger = logging.getLogger(__name__)
+
+# fields that must be present in each imported row, `copies` defaults to 1
+REQUIRED_FIELDS = [field.name for field in BookFields if field != BookFields.copies]
+
+
+class ImportReport:
+    '''
+    Counters of the imported rows.
+    '''
+
+    def __init__(self) -> None:
+        self.read = 0
+        self.added = 0
+        self.merged = 0
+        self.rejected = 0
+
+    def __str__(self) -> str:
+        return (f'{self.read} rows read: {self.added} books added, '
+                f'{self.merged} merged into existing books, {self.rejected} rejected')
+
+
+def read_rows(file: TextIO, file_format: str) -> Iterator[dict]:
+    '''
+    Stream the rows of a CSV file with a header row or of a JSONL file with an object per line.
+    The keys are lowercased, so both `isbn` and `ISBN` headers are accepted.
+
+    :param file: opened text file
+    :param file_format: `csv` or `jsonl`
+    :return: iterator of the row dicts
+    '''
+    if file_format == 'csv':
+        rows: Iterable[dict] = csv.DictReader(file)
+    else:
+        rows = (json.loads(line) for line in file if line.strip())
+    for row in rows:
+        yield {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+
+
+def validate_row(row: dict) -> Book:
+    '''
+    Validate the imported row with the `Book` model.
+
+    :param row: dict of the book fields
+    :return: validated `Book` instance
+    :raise ValueError: if a required field is missing or invalid
+    '''
+    values: dict[str, Any] = {
+        field.name: str(row[field.name]).strip() for field in BookFields
+        if row.get(field.name) not in (None, '')
+    }
+    missing = [field for field in REQUIRED_FIELDS if field not in values]
+    if missing:
+        raise ValueError(f'Missing fields: {", ".join(missing)}')
+    try:
+        return Book(**values)
+    except ValidationError as e:
+        raise ValueError('; '.join(error['msg'] for error in e.errors()))
+
+
+@measured
+def import_books(
+        library: Library,
+        rows: Iterable[dict],
+        rejects: TextIO | None = None,
+        progress: Callable[[ImportReport], None] | None = None,
+        progress_every: int = 1000
+) -> ImportReport:
+    '''
+    Import the books to the library stock.
+
+    :param library: connected Library instance
+    :param rows: iterable of the book dicts, e.g. from `read_rows`
+    :param rejects: text file to write the invalid rows to, one JSON object per line
+    :param progress: function called with the `ImportReport` every `progress_every` rows
+    :param progress_every: number of rows between the progress calls
+    :return: `ImportReport` of the import
+    '''
+    w_set = WorksheetSets.stock.value
+    report = ImportReport()
+
+    # the import must not delay the interactive requests
+    with library.scheduler.priority(Priority.background):
+        # read the stock without caching its snapshot, so the appended books are not kept in memory by it,
+        # keep only the row number and the number of copies of the books by ISBN
+        library.invalidate_snapshots(w_set)
+        values = library.read_values(w_set)
+        headers = values[0] if values else []
+        isbn_col = library.get_col(w_set, BookFields.isbn.name, headers)
+        copies_col = library.get_col(w_set, BookFields.copies.name, headers)
+        stock: dict[str, tuple[int, str]] = {}
+        for cell_row, row_values in enumerate(values[1:], start=2):
+            if isbn_col <= len(row_values) and row_values[isbn_col - 1]:
+                stock_copies = row_values[copies_col - 1] if copies_col <= len(row_values) else ''
+                stock.setdefault(row_values[isbn_col - 1], (cell_row, stock_copies))
+        next_row = len(values) + 1
+        del values
+
+        with library.operation():
+            for line, row in enumerate(rows, start=1):
+                report.read += 1
+                try:
+                    book = validate_row(row)
+                except ValueError as e:
+                    report.rejected += 1
+                    if rejects is not None:
+                        rejects.write(json.dumps({'line': line, 'row': row, 'error': str(e)}) + '\n')
+                else:
+                    copies = book.copies or 1
+                    if book.isbn in stock:
+                        cell_row, current_copies = stock[book.isbn]
+                        updated = library.add_book_copies(
+                            {'cell_row': cell_row, BookFields.copies.name: current_copies}, w_set, copies
+                        )
+                        stock[book.isbn] = (cell_row, str(updated[BookFields.copies.name]))
+                        report.merged += 1
+                    else:
+                        book.copies = copies
+                        library.append_book(book, w_set)
+                        stock[str(book.isbn)] = (next_row, str(copies))
+                        next_row += 1
+                        report.added += 1
+
+                if progress is not None and report.read % progress_every == 0:
+                    progress(report)
+
+    logger.info('Bulk import finished: %s', report)
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    '''
+    Run the bulk import from the command line.
+    '''
+    from library_system.tools import library_init
+
+    parser = argparse.ArgumentParser(description='Import books to the library stock from a CSV or JSONL file.')
+    parser.add_argument('file', help='CSV file with a header row or JSONL file with a book object per line')
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='file format, detected by the file extension by default')
+    parser.add_argument('--rejects', help='file to write the invalid rows to (JSONL)')
+    parser.add_argument('--progress-every', type=int, default=1000, help='rows between the progress reports')
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ('jsonl' if args.file.endswith(('.jsonl', '.json')) else 'csv')
+    library = library_init()
+
+    def print_progress(report: ImportReport):
+        print(f'... {report}', file=sys.stderr)
+
+    with open(args.file, newline='', encoding='utf-8') as file:
+        rejects = open(args.rejects, 'w', encoding='utf-8') if args.rejects else None
+        try:
+            report = import_books(
+                library, read_rows(file, file_format), rejects, print_progress, args.progress_every
+            )
+        finally:
+            if rejects is not None:
+                rejects.close()
+    print(f'Import finished: {report}')
+    return 0 if not report.rejected else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
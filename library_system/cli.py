@@ -0,0 +1,318 @@
+'''
+Headless command line interface of the library operations.
+
+The commands call the `Library` directly, without the menus, pauses and screen clears of the interactive app,
+and print the result as a JSON object to the standard output.
+A failed command prints `{"ok": false, "error": ...}` and exits with the code 1.
+
+Usage:
+    python -m library_system.cli add --isbn 9781449357351 --title "Python Cookbook" \\
+        --author "David Beazley" --genre Computers --year 2013 --copies 2
+    python -m library_system.cli remove --isbn 9781449357351 [--copies 1 | --all]
+    python -m library_system.cli checkout --isbn 9781449357351 --borrower "Ann Lee" [--due-date 01-06-2023 | --days 14]
+    python -m library_system.cli return --isbn 9781449357351 --borrower "Ann Lee"
+    python -m library_system.cli overdue [--days 7]
+    python -m library_system.cli view {stock,borrowed} [--sort author year] [--desc] [--limit 10]
+    python -m library_system.cli export {stock,borrowed} -o stock.csv [--format csv]
+    python -m library_system.cli batch commands.txt
+
+`batch` runs the commands of the file (`-` for the standard input), one command per line, e.g.
+`checkout --isbn 9781449357351 --borrower "Ann Lee"`, with a single Library connection
+and prints a JSON result per line. Empty lines and lines starting with `#` are skipped.
+'''
+import argparse
+import json
+import logging
+import shlex
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from typing import IO, TYPE_CHECKING, Any, Callable
+
+from pydantic import ValidationError
+
+from library_system.models.book import Book, BookFields, BorrowFields
+from library_system.models.dates import format_date
+from library_system.models.worksheets_cfg import WorksheetSets, WorksheetSet
+
+if TYPE_CHECKING:
+    from library_system.models.spreadsheet import Library
+
+logger = logging.getLogger(__name__)
+
+# number of days a book is borrowed for if the due date is not given
+LOAN_DAYS = 14
+
+
+def book_dict(book: dict | None, w_set: WorksheetSet) -> dict | None:
+    '''
+    Get the worksheet fields of the book, without its `cell_row` and row id.
+    '''
+    if book is None:
+        return None
+    return {field: book.get(field) for field in w_set['fields']}
+
+
+def validate(**values) -> Book:
+    '''
+    Validate the book values with the `Book` model.
+
+    :raise ValueError: if a value is invalid
+    '''
+    try:
+        return Book(**values)
+    except ValidationError as e:
+        raise ValueError('; '.join(error['msg'] for error in e.errors()))
+
+
+def find_book(library: 'Library', isbn: str) -> dict:
+    '''
+    Find the book in the stock by ISBN.
+
+    :raise ValueError: if the book is not in the stock
+    '''
+    found_books = library.search_books(isbn, BookFields.isbn, WorksheetSets.stock.value)
+    if not found_books:
+        raise ValueError(f"Can't to find the book <{isbn}> in the stock")
+    return found_books[0]
+
+
+def add(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Add copies to the book if its ISBN is in the stock, otherwise add the new book.
+    '''
+    w_set = WorksheetSets.stock.value
+    book = validate(isbn=args.isbn, copies=args.copies)
+    found_books = library.search_books(str(book.isbn), BookFields.isbn, w_set)
+    if found_books:
+        updated = library.add_book_copies(found_books[0], w_set, book.copies or 1)
+        return {'action': 'copies_added', 'book': book_dict(updated, w_set)}
+
+    values = {field.name: getattr(args, field.name) for field in BookFields}
+    missing = [name for name, value in values.items() if value is None and name != BookFields.copies.name]
+    if missing:
+        raise ValueError(f'The book <{book.isbn}> is not in the stock, missing fields: {", ".join(missing)}')
+    new_book = validate(**values)
+    new_book.copies = new_book.copies or 1
+    return {'action': 'added', 'book': book_dict(library.append_book(new_book, w_set), w_set)}
+
+
+def remove(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Remove copies of the book from the stock, or the whole book.
+    '''
+    w_set = WorksheetSets.stock.value
+    book = validate(isbn=args.isbn)
+    updated = library.remove_book(find_book(library, str(book.isbn)), w_set, args.copies, totally=args.all)
+    return {'action': 'removed' if updated is None else 'copies_removed', 'book': book_dict(updated, w_set)}
+
+
+def checkout(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Check out a copy of the book to the borrower.
+    '''
+    today = datetime.today()
+    due_date = args.due_date or format_date(today + timedelta(days=args.days))
+    book = validate(isbn=args.isbn, borrower_name=args.borrower, due_date=due_date)
+    book_to_check_out = find_book(library, str(book.isbn)) | {
+        BorrowFields.borrower_name.name: book.borrower_name,
+        BorrowFields.borrow_date.name: format_date(today),
+        BorrowFields.due_date.name: book.due_date,
+    }
+    updated = library.check_out_book(book_to_check_out)
+    return {
+        'action': 'checked_out',
+        'loan': book_dict(book_to_check_out, WorksheetSets.borrowed.value),
+        'book': book_dict(updated, WorksheetSets.stock.value),
+    }
+
+
+def return_(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Return the book borrowed by the borrower to the stock.
+    '''
+    book = validate(isbn=args.isbn, borrower_name=args.borrower, search_mode=True)
+    loans = [
+        loan for loan in library.search_books(str(book.isbn), BorrowFields.isbn, WorksheetSets.borrowed.value)
+        if str(loan.get(BorrowFields.borrower_name.name, '')).casefold() == str(book.borrower_name).casefold()
+    ]
+    if not loans:
+        raise ValueError(f"Can't to find the book <{book.isbn}> borrowed by <{book.borrower_name}>")
+    loan = loans[0]
+    updated = library.return_book(loan)
+    return {
+        'action': 'returned',
+        'loan': book_dict(loan, WorksheetSets.borrowed.value),
+        'book': book_dict(updated, WorksheetSets.stock.value),
+    }
+
+
+def overdue(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Get the overdue borrowers, sorted by due date.
+    '''
+    records = library.get_overdue_borrowers(args.days)
+    return {'count': len(records), 'rows': [record.to_dict() for record in records]}
+
+
+def view(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Get the rows of the worksheet, sorted by the given fields.
+    '''
+    w_set = WorksheetSets[args.worksheet].value
+    fields_enum = BookFields if args.worksheet == WorksheetSets.stock.name else BorrowFields
+    try:
+        fields = [fields_enum[name] for name in args.sort or []]
+    except KeyError as e:
+        raise ValueError(f'Unknown field {e} of the worksheet <{w_set["title"]}>')
+    records = library.get_library_stock(w_set, fields or None, args.desc, args.limit)
+    return {'count': len(records), 'rows': [record.to_dict() for record in records]}
+
+
+def export(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Export the worksheet to the file, see `library_system.export`.
+    '''
+    from library_system.export import export_worksheet
+
+    w_set = WorksheetSets[args.worksheet].value
+    file: IO[Any]
+    if args.format == 'columnar':
+        file = open(args.output, 'wb')
+    else:
+        file = open(args.output, 'w', newline='', encoding='utf-8')
+    with file as out:
+        count = export_worksheet(library, w_set, args.format, out, args.page_size)
+    return {'exported': count, 'output': args.output}
+
+
+def run_command(library: 'Library', args: argparse.Namespace) -> dict:
+    '''
+    Run the parsed command and get its JSON result.
+    '''
+    command: Callable[['Library', argparse.Namespace], dict] = args.func
+    try:
+        return {'ok': True, 'command': args.command} | command(library, args)
+    except ValueError as e:
+        logger.warning('Command <%s> failed: %s', args.command, e)
+        return {'ok': False, 'command': args.command, 'error': str(e)}
+    except Exception as e:
+        logger.error('Command <%s> failed: %s: %s', args.command, type(e), e)
+        return {'ok': False, 'command': args.command, 'error': f'{type(e).__name__}: {e}'}
+
+
+def batch(library: 'Library', args: argparse.Namespace, parser: argparse.ArgumentParser) -> bool:
+    '''
+    Run the commands of the batch file, print a JSON result per command.
+
+    :return: `True` if all the commands succeeded
+    '''
+    file: IO[str] = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8')
+    all_ok = True
+    with file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            result: dict
+            try:
+                # argparse prints the help to the standard output, keep it for the JSON results
+                with redirect_stdout(sys.stderr):
+                    command_args = parser.parse_args(shlex.split(line))
+                if command_args.command == 'batch':
+                    raise ValueError("Batch files can't run the batch command")
+            except SystemExit as e:
+                # argparse has printed the usage error or the help to the standard error
+                error = 'Invalid command' if e.code else 'No command run, the help is printed to the standard error'
+                result = {'ok': False, 'error': error}
+            except ValueError as e:
+                result = {'ok': False, 'error': str(e)}
+            else:
+                result = run_command(library, command_args)
+            all_ok = all_ok and bool(result['ok'])
+            print(json.dumps({'line': line_number} | result, ensure_ascii=False), flush=True)
+    return all_ok
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m library_system.cli', description='Run the library operations without the menus.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    worksheets = [w_set.name for w_set in WorksheetSets]
+
+    add_parser = commands.add_parser('add', help='add a book or copies of a book to the stock')
+    for field in BookFields:
+        add_parser.add_argument(f'--{field.name}', required=field == BookFields.isbn)
+    add_parser.set_defaults(func=add)
+
+    remove_parser = commands.add_parser('remove', help='remove copies of a book or the whole book from the stock')
+    remove_parser.add_argument('--isbn', required=True)
+    remove_group = remove_parser.add_mutually_exclusive_group()
+    remove_group.add_argument('--copies', type=int, default=1)
+    remove_group.add_argument('--all', action='store_true', help='remove the book from the stock')
+    remove_parser.set_defaults(func=remove)
+
+    checkout_parser = commands.add_parser('checkout', help='check out a copy of a book to a borrower')
+    checkout_parser.add_argument('--isbn', required=True)
+    checkout_parser.add_argument('--borrower', required=True)
+    due_group = checkout_parser.add_mutually_exclusive_group()
+    due_group.add_argument('--due-date', help='dd-mm-yyyy')
+    due_group.add_argument('--days', type=int, default=LOAN_DAYS, help='days from today to the due date')
+    checkout_parser.set_defaults(func=checkout)
+
+    return_parser = commands.add_parser('return', help='return a borrowed book to the stock')
+    return_parser.add_argument('--isbn', required=True)
+    return_parser.add_argument('--borrower', required=True)
+    return_parser.set_defaults(func=return_)
+
+    overdue_parser = commands.add_parser('overdue', help='list the overdue borrowers')
+    overdue_parser.add_argument('--days', type=int, default=0, help='overdue by more than the number of days')
+    overdue_parser.set_defaults(func=overdue)
+
+    view_parser = commands.add_parser('view', help='list the rows of a worksheet')
+    view_parser.add_argument('worksheet', choices=worksheets)
+    view_parser.add_argument('--sort', nargs='+', metavar='FIELD', help='fields to sort the rows by')
+    view_parser.add_argument('--desc', action='store_true', help='sort in descending order')
+    view_parser.add_argument('--limit', type=int)
+    view_parser.set_defaults(func=view)
+
+    export_parser = commands.add_parser('export', help='export a worksheet to a CSV, JSONL or columnar file')
+    export_parser.add_argument('worksheet', choices=worksheets)
+    export_parser.add_argument('-o', '--output', required=True)
+    export_parser.add_argument('--format', choices=['csv', 'jsonl', 'columnar'], default='csv')
+    export_parser.add_argument('--page-size', type=int, default=1000, help='rows read by one request')
+    export_parser.set_defaults(func=export)
+
+    batch_parser = commands.add_parser('batch', help='run the commands of a file, one per line')
+    batch_parser.add_argument('file', help='file of the commands, - for the standard input')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    '''
+    Run the command from the command line.
+    '''
+    from library_system.logs import setup_logging
+    from library_system.tools import open_library
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # ship the logs as the app does, nothing is logged to the standard output
+    setup_logging()
+    try:
+        library = open_library()
+    except Exception as e:
+        logger.error('Failed to open the Library: %s: %s', type(e), e)
+        print(json.dumps({'ok': False, 'command': args.command, 'error': f'{type(e).__name__}: {e}'}))
+        return 1
+
+    if args.command == 'batch':
+        return 0 if batch(library, args, parser) else 1
+    result = run_command(library, args)
+    print(json.dumps(result, ensure_ascii=False))
+    return 0 if result['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,5 +4,68 @@ This file contains all the configuration variables for the application.
 import os
 
 LOGTAIL_TOKEN = os.getenv('LOGTAIL_TOKEN')
+# print the startup profile instead of running the app, same as `run.py --profile-startup`
+PROFILE_STARTUP = bool(os.getenv('PROFILE_STARTUP'))
+# profile each Main Menu operation with cProfile, same as `run.py --profile-operations`:
+# the profiles are saved to PROFILE_DIR and the top PROFILE_TOP functions by cumulative time are printed
+PROFILE_OPERATIONS = bool(os.getenv('PROFILE_OPERATIONS'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', '20'))
 SHEET_NAME = 'library-management-system'
 CREDS_PATH = 'creds.json'
+
+# storage backend of the worksheets: `gsheet`, `memory` or `sqlite`
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'gsheet')
+STOCK_BACKEND = os.getenv('STOCK_BACKEND', STORAGE_BACKEND)
+BORROWED_BACKEND = os.getenv('BORROWED_BACKEND', STORAGE_BACKEND)
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'library.db')
+
+# number of seconds the worksheets snapshots are cached, `0` disables the cache
+CACHE_TTL = float(os.getenv('CACHE_TTL', '60'))
+
+# writes are sent in batches: flushed after each operation or when
+# the batch reaches WRITE_BATCH_SIZE writes or WRITE_BATCH_DELAY seconds
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', '500'))
+WRITE_BATCH_DELAY = float(os.getenv('WRITE_BATCH_DELAY', '5'))
+
+# removed rows are cleared and the empty rows are deleted in one batch
+# when the number of the rows removed by the app reaches COMPACT_TOMBSTONES
+COMPACT_TOMBSTONES = int(os.getenv('COMPACT_TOMBSTONES', '100'))
+
+# the Google API access token is refreshed between the operations
+# when it expires in less than TOKEN_REFRESH_MARGIN seconds
+TOKEN_REFRESH_MARGIN = float(os.getenv('TOKEN_REFRESH_MARGIN', '300'))
+
+# number of times a Main Menu option failed with a request error is run again,
+# the Library is reconnected before if the error is a connection or auth error, then the app goes back to the Main Menu
+RESTART_RETRIES = int(os.getenv('RESTART_RETRIES', '1'))
+
+# Google Sheets API requests per minute: the requests wait for the quota instead of failing with 429,
+# up to SHEETS_BURST requests of each kind are sent at once
+SHEETS_READ_QUOTA = int(os.getenv('SHEETS_READ_QUOTA', '60'))
+SHEETS_WRITE_QUOTA = int(os.getenv('SHEETS_WRITE_QUOTA', '60'))
+SHEETS_BURST = int(os.getenv('SHEETS_BURST', '10'))
+# retries of the requests failed with a rate limit or a server error, with up to REQUEST_BACKOFF_MAX seconds between
+REQUEST_RETRIES = int(os.getenv('REQUEST_RETRIES', '5'))
+REQUEST_BACKOFF_MAX = float(os.getenv('REQUEST_BACKOFF_MAX', '32'))
+
+# the logs are shipped to Logtail by a background thread in batches of LOG_BATCH_SIZE records
+# or every LOG_FLUSH_INTERVAL seconds
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '100'))
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '2'))
+# records waiting for the shipping, when the queue is full the new (`drop_new`) or the oldest (`drop_oldest`)
+# records are dropped instead of blocking the app
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_DROP_POLICY = os.getenv('LOG_DROP_POLICY', 'drop_new')
+# the records are written to the rotating LOG_FILE when Logtail is unreachable or LOGTAIL_TOKEN is not set,
+# the upload is tried again after LOG_RETRY_INTERVAL seconds
+LOG_FILE = os.getenv('LOG_FILE', 'library.log')
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv('LOG_FILE_BACKUPS', '3'))
+LOG_RETRY_INTERVAL = float(os.getenv('LOG_RETRY_INTERVAL', '60'))
+
+# count and time the storage calls by operation and method, shown by the "Diagnostics" option of the Main Menu
+# and dumped to METRICS_FILE on exit
+METRICS = bool(os.getenv('METRICS'))
+METRICS_FILE = os.getenv('METRICS_FILE', 'metrics.json')
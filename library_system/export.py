@@ -0,0 +1,209 @@
+'''
+Streaming export of the `stock` and `borrowed` worksheets.
+
+The worksheet is read in pages of rows, so the memory used doesn't depend on the worksheet size.
+Supported formats:
+- `csv`: header row and a row per book;
+- `jsonl`: a JSON object per book;
+- `columnar`: msgpack stream of a header object followed by row groups (one per page),
+  each row group maps the fields to the column values, repeated values are dictionary encoded.
+  Use `read_columnar` to read the file back.
+
+Usage:
+    python -m library_system.export stock --format csv > stock.csv
+'''
+import argparse
+import csv
+import json
+import logging
+import sys
+from contextlib import redirect_stdout
+from typing import IO, Any, BinaryIO, Iterator, TextIO
+
+from library_system.models.spreadsheet import Library
+from library_system.models.scheduler import Priority
+from library_system.models.metrics import measured
+from library_system.models.storage import is_blank
+from library_system.models.worksheets_cfg import WorksheetSets, WorksheetSet
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMAT = 'lms-columnar'
+COLUMNAR_VERSION = 1
+
+
+def iter_pages(w_set: WorksheetSet, page_size: int = 1000) -> Iterator[list[list[str]]]:
+    '''
+    Read the worksheet rows below the header in pages.
+    Each row is padded or cut to the number of the worksheet fields, the empty rows are skipped.
+    The pages are read up to the row count of the worksheet taken before the first page:
+    a page can't tell the end of the worksheet, as the trailing empty rows of a range are not returned.
+
+    :param w_set: The `WorksheetSet` to read.
+    :param page_size: number of rows read by one request
+    :return: iterator of the pages (lists of rows)
+    '''
+    w_sheet = w_set['w_sheet']
+    if not w_sheet:
+        raise ValueError(
+            f"Can't to find the worksheet <{w_set['title']}>"
+        )
+    width = len(w_set['fields'])
+    row_count = w_sheet.row_count()
+    for start in range(2, row_count + 1, page_size):
+        page = w_sheet.get_rows(start, min(start + page_size - 1, row_count))
+        rows = [(row + [''] * width)[:width] for row in page if not is_blank(row)]
+        if rows:
+            yield rows
+
+
+def export_csv(pages: Iterator[list[list[str]]], fields: list[str], out: TextIO) -> int:
+    '''
+    Write the pages to the CSV file.
+
+    :return: number of the exported rows
+    '''
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    count = 0
+    for page in pages:
+        writer.writerows(page)
+        count += len(page)
+    return count
+
+
+def export_jsonl(pages: Iterator[list[list[str]]], fields: list[str], out: TextIO) -> int:
+    '''
+    Write the pages to the JSONL file.
+
+    :return: number of the exported rows
+    '''
+    count = 0
+    for page in pages:
+        out.writelines(json.dumps(dict(zip(fields, row))) + '\n' for row in page)
+        count += len(page)
+    return count
+
+
+def _encode_column(values: list[str]) -> dict:
+    '''
+    Encode the column values of a row group, use dictionary encoding if the values repeat.
+    '''
+    uniques: dict[str, int] = {}
+    indexes = [uniques.setdefault(value, len(uniques)) for value in values]
+    if len(uniques) * 2 <= len(values):
+        return {'dict': list(uniques), 'idx': indexes}
+    return {'values': values}
+
+
+def _decode_column(column: dict) -> list[str]:
+    if 'dict' in column:
+        return [column['dict'][i] for i in column['idx']]
+    return column['values']
+
+
+def export_columnar(pages: Iterator[list[list[str]]], fields: list[str], out: BinaryIO, title: str = '') -> int:
+    '''
+    Write the pages to the compact columnar binary file.
+    Requires the `msgpack` package.
+
+    :return: number of the exported rows
+    '''
+    import msgpack
+
+    packer = msgpack.Packer()
+    out.write(packer.pack({
+        'format': COLUMNAR_FORMAT, 'version': COLUMNAR_VERSION, 'worksheet': title, 'fields': fields
+    }))
+    count = 0
+    for page in pages:
+        columns = {field: _encode_column([row[i] for row in page]) for i, field in enumerate(fields)}
+        out.write(packer.pack({'rows': len(page), 'columns': columns}))
+        count += len(page)
+    return count
+
+
+def read_columnar(file: BinaryIO) -> Iterator[dict]:
+    '''
+    Read the rows of a columnar file written by `export_columnar`, one row group at a time.
+
+    :param file: file opened in binary mode
+    :return: iterator of the row dicts
+    '''
+    import msgpack
+
+    unpacker = msgpack.Unpacker(file, raw=False)
+    header = next(unpacker)
+    if header.get('format') != COLUMNAR_FORMAT:
+        raise ValueError('Not a library columnar export file')
+    fields = header['fields']
+    for group in unpacker:
+        columns = [_decode_column(group['columns'][field]) for field in fields]
+        for values in zip(*columns):
+            yield dict(zip(fields, values))
+
+
+@measured
+def export_worksheet(
+        library: Library, w_set: WorksheetSet, file_format: str, out: TextIO | BinaryIO, page_size: int = 1000
+) -> int:
+    '''
+    Export the worksheet rows to the opened file in the given format.
+
+    :param library: connected Library instance
+    :param w_set: The `WorksheetSet` to export.
+    :param file_format: `csv`, `jsonl` or `columnar`
+    :param out: text file for `csv` and `jsonl`, binary file for `columnar`
+    :param page_size: number of rows read by one request
+    :return: number of the exported rows
+    '''
+    if file_format not in ('csv', 'jsonl', 'columnar'):
+        raise ValueError(f'Unknown export format <{file_format}>')
+    pages = iter_pages(w_set, page_size)
+    fields = w_set['fields']
+    # the export must not delay the interactive requests
+    with library.scheduler.priority(Priority.background):
+        if file_format == 'csv':
+            count = export_csv(pages, fields, out)  # type: ignore[arg-type]
+        elif file_format == 'jsonl':
+            count = export_jsonl(pages, fields, out)  # type: ignore[arg-type]
+        else:
+            count = export_columnar(pages, fields, out, w_set['title'])  # type: ignore[arg-type]
+    logger.info('Exported %s rows of the worksheet <%s> to %s', count, w_set['title'], file_format)
+    return count
+
+
+def main(argv: list[str] | None = None) -> int:
+    '''
+    Run the export from the command line.
+    '''
+    from library_system.tools import library_init
+
+    parser = argparse.ArgumentParser(description='Export a library worksheet to CSV, JSONL or columnar file.')
+    parser.add_argument('worksheet', choices=[w_set.name for w_set in WorksheetSets])
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'columnar'], default='csv')
+    parser.add_argument('-o', '--output', help='output file, standard output by default')
+    parser.add_argument('--page-size', type=int, default=1000, help='rows read by one request')
+    args = parser.parse_args(argv)
+
+    # keep the standard output clean for the exported data
+    with redirect_stdout(sys.stderr):
+        library = library_init()
+    w_set = WorksheetSets[args.worksheet].value
+
+    binary = args.format == 'columnar'
+    out: IO[Any]
+    if args.output:
+        file: IO[Any] = open(args.output, 'wb') if binary else open(args.output, 'w', newline='', encoding='utf-8')
+        with file as out:
+            count = export_worksheet(library, w_set, args.format, out, args.page_size)
+    else:
+        out = sys.stdout.buffer if binary else sys.stdout
+        count = export_worksheet(library, w_set, args.format, out, args.page_size)
+        out.flush()
+    print(f'Exported {count} rows.', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
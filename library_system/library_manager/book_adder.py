@@ -2,13 +2,13 @@ import time
 from rich import box
 import logging
 
-from library_system.tools import library_init, clear_terminal, F
+from library_system.tools import clear_terminal, F
 from library_system.views.console_ui import Menu, get_book_input, display_book
 from library_system.views.menus import MenuSets
 from library_system.models.spreadsheet import Library
 from library_system.models.book import Book, BookFields
 from library_system.models.worksheets_cfg import WorksheetSets
-from library_system.back_to_menu import back_to_menu
+from library_system.back_to_menu import Navigation, restart_after
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +61,7 @@ def show_found_books(book: Book, book_field: BookFields, found_books: list[dict]
     return book_to_add
 
 
-def add_copies_to_book(library: Library, book: Book, book_to_add: dict):
+def add_copies_to_book(library: Library, book: Book, book_to_add: dict) -> Navigation:
     '''
     Prompt the user to enter the number of copies to add.
     Call the library.add_book_copies() method to add copies to the book.
@@ -69,6 +69,7 @@ def add_copies_to_book(library: Library, book: Book, book_to_add: dict):
     param library: Library instance
     param book: Book instance
     param book_to_add: book to add to the library stock
+    :return: the next step of the menu loop
     '''
     clear_terminal()
     title = 'You selected:'
@@ -85,19 +86,19 @@ def add_copies_to_book(library: Library, book: Book, book_to_add: dict):
     except Exception as e:
         print(f'{F.ERROR}Failed to add the book copies to the library stock.\nTry again{F.ENDC}')
         print(f'{F.ERROR}Restarting...{F.ENDC}')
-        logger.error(f'Failed to add the book to the library stock: {type(e)}: {e}')
-        library = library_init()
-        add_book(library)
+        logger.error('Failed to add the book to the library stock: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         clear_terminal()
         print(
             f'{F.YELLOW}Successfully added {copies} copies of the book to the library stock.{F.ENDC}\n')
-        logger.info(f'Added {copies} copies of the book: {book_to_add}')
+        logger.info('Added %s copies of the book: %s', copies, book_to_add)
         title = 'Updated book:'
         display_book(updated_book_dict, table_title=title)
+        return Navigation.main_menu
 
 
-def add_full_book(library: Library, book: Book, book_field: BookFields):
+def add_full_book(library: Library, book: Book, book_field: BookFields) -> Navigation:
     '''
     Prompt the user to enter the remaining book fields.
     Add the book to the library stock using the library.append_book() method.
@@ -105,6 +106,7 @@ def add_full_book(library: Library, book: Book, book_field: BookFields):
     param library: Library instance
     param book: Book instance
     param book_field: selected BookFields attribute
+    :return: the next step of the menu loop
     '''
 
     # skip the book field that was used to search for the book and the book ISBN
@@ -121,18 +123,18 @@ def add_full_book(library: Library, book: Book, book_field: BookFields):
     except Exception as e:
         print(f'{F.ERROR}Failed to add the book to the library stock.\nTry again{F.ENDC}')
         print(f'{F.ERROR}Restarting...{F.ENDC}')
-        logger.error(f'Failed to add the book to the library stock: {type(e)}: {e}')
-        library = library_init()
-        add_book(library)
+        logger.error('Failed to add the book to the library stock: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         clear_terminal()
         print(f'{F.YELLOW}Successfully added the book to the library stock.{F.ENDC}\n')
-        logger.info(f'Added the new book: {book}')
+        logger.info('Added the new book: %s', book)
         title = 'Added book:'
         display_book(added_book, table_title=title)
+        return Navigation.main_menu
 
 
-def search_books(library: Library, book: Book, book_field: BookFields):
+def search_books(library: Library, book: Book, book_field: BookFields) -> list[dict] | Navigation:
     '''
     Get the book field value from the user and
     search for the book in the library stock using the library.search_books() method.
@@ -140,6 +142,7 @@ def search_books(library: Library, book: Book, book_field: BookFields):
     param library: Library instance
     param book: Book instance
     param book_field: selected BookFields attribute
+    :return: found books or the next step of the menu loop if the search failed
     '''
 
     book_value = get_book_input(book, book_field)
@@ -152,16 +155,14 @@ def search_books(library: Library, book: Book, book_field: BookFields):
     except Exception as e:
         print(f'{F.ERROR}Failed to search for the book.\nTry again{F.ENDC}')
         print(f'{F.ERROR}Restarting...{F.ENDC}')
-        logger.error(f'Failed to search for the book: {type(e)}: {e}')
-        library = library_init()
-        add_book(library)
-        return None
+        logger.error('Failed to search for the book: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         return found_books
 
 
 # entry point for the add book functionality
-def add_book(library: Library):
+def add_book(library: Library) -> Navigation:
     logger.info('Starting the `add book` functionality.')
     book = Book()
 
@@ -169,25 +170,25 @@ def add_book(library: Library):
 
     book_field = run_field_selection_menu()
     found_books = search_books(library, book, book_field)
+    if isinstance(found_books, Navigation):
+        return found_books
 
     if found_books:
         clear_terminal()
         book_to_add = show_found_books(book, book_field, found_books)
-        add_copies_to_book(library, book, book_to_add)
-        back_to_menu(library)
-    else:
-        print(f'{F.ERROR}No books matching the {book_field.value}{F.ENDC}\n')
-        time.sleep(3)
-        clear_terminal()
-        print(f'{F.YELLOW}CONTINUE ADDING A NEW BOOK{F.ENDC}\n')
-        if book_field == BookFields.isbn:
-            add_full_book(library, book, book_field)
-            back_to_menu(library)
-            return
-        found_books = search_books(library, book, BookFields.isbn)
-        if found_books:
-            book_to_add = show_found_books(book, BookFields.isbn, found_books)
-            add_copies_to_book(library, book, book_to_add)
-            back_to_menu(library)
-        else:
-            add_full_book(library, book, book_field)
+        return add_copies_to_book(library, book, book_to_add)
+
+    print(f'{F.ERROR}No books matching the {book_field.value}{F.ENDC}\n')
+    time.sleep(3)
+    clear_terminal()
+    print(f'{F.YELLOW}CONTINUE ADDING A NEW BOOK{F.ENDC}\n')
+    if book_field == BookFields.isbn:
+        return add_full_book(library, book, book_field)
+
+    found_books = search_books(library, book, BookFields.isbn)
+    if isinstance(found_books, Navigation):
+        return found_books
+    if found_books:
+        book_to_add = show_found_books(book, BookFields.isbn, found_books)
+        return add_copies_to_book(library, book, book_to_add)
+    return add_full_book(library, book, book_field)
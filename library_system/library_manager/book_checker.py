@@ -3,13 +3,13 @@ from datetime import date as dt
 import time
 from rich import box
 
-from library_system.tools import library_init, clear_terminal, F
+from library_system.tools import clear_terminal, F
 from library_system.views.console_ui import Menu, get_book_input, display_book
 from library_system.views.menus import MenuSets
 from library_system.models.spreadsheet import Library
 from library_system.models.book import Book, BookFields, BorrowFields
 from library_system.models.worksheets_cfg import WorksheetSets
-from library_system.back_to_menu import back_to_menu
+from library_system.back_to_menu import Navigation, restart_after
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +63,7 @@ def show_found_books(book: Book, book_field: BookFields, found_books: list[dict]
     return book_to_check_out
 
 
-def set_borowing_details(library: Library, book: Book, book_to_check_out: dict):
+def set_borowing_details(library: Library, book: Book, book_to_check_out: dict) -> Navigation:
     clear_terminal()
     title = 'You selected:'
     display_book(book_to_check_out, table_title=title)
@@ -81,12 +81,12 @@ def set_borowing_details(library: Library, book: Book, book_to_check_out: dict):
     except Exception as e:
         print(f'{F.ERROR}Failed to check out the book.\nTry again{F.ENDC}')
         print(f'{F.ERROR}Restarting...{F.ENDC}')
-        logger.error(f'Failed to check out the book: {type(e)}: {e}')
-        library = library_init()
-        check_out_book(library)
+        logger.error('Failed to check out the book: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         borrower = book_to_check_out.get(BorrowFields.borrower_name.name)
         show_updated_book(upd_book, borrower)
+        return Navigation.main_menu
 
 
 def show_updated_book(updated_book: dict | None, borrower: str | None):
@@ -97,13 +97,13 @@ def show_updated_book(updated_book: dict | None, borrower: str | None):
         clear_terminal()
         print(f'{F.YELLOW}A copy of the book has been borrowed by {borrower} and\n'
               f'checked out from the library stock.{F.ENDC}\n')
-        logger.info(f'Book: {updated_book} has been borrowed by {borrower}')
+        logger.info('Book: %s has been borrowed by %s', updated_book, borrower)
         title = 'Current stock:'
         display_book(updated_book, table_title=title)
 
 
 # entry point for the check out book functionality
-def check_out_book(library: Library):
+def check_out_book(library: Library) -> Navigation:
     logger.info('Starting the check out book functionality')
     book = Book()
 
@@ -120,16 +120,14 @@ def check_out_book(library: Library):
     except Exception as e:
         print(f'{F.ERROR}Failed to search for the book.\nTry again{F.ENDC}')
         print(f'{F.ERROR}Restarting...{F.ENDC}')
-        logger.error(f'Failed to search for the book: {type(e)}: {e}')
-        library = library_init()
-        check_out_book(library)
+        logger.error('Failed to search for the book: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         if not len(found_books):
             print(f'{F.ERROR}No books matching the {book_field.value}\n'
                   f'Try again...{F.ENDC}')
             time.sleep(3)
-            check_out_book(library)
+            return Navigation.repeat
         else:
             book_to_check_out = show_found_books(book, book_field, found_books)
-            set_borowing_details(library, book, book_to_check_out)
-            back_to_menu(library)
+            return set_borowing_details(library, book, book_to_check_out)
@@ -2,13 +2,13 @@ import time
 from rich import box
 import logging
 
-from library_system.tools import clear_terminal, library_init, F
+from library_system.tools import clear_terminal, F
 from library_system.views.console_ui import Menu, get_book_input, display_book
 from library_system.views.menus import MenuSets
 from library_system.models.spreadsheet import Library
 from library_system.models.book import Book, BookFields
 from library_system.models.worksheets_cfg import WorksheetSets
-from library_system.back_to_menu import back_to_menu
+from library_system.back_to_menu import Navigation, restart_after
 
 
 logger = logging.getLogger(__name__)
@@ -65,7 +65,7 @@ def show_found_books(book: Book, book_field: BookFields, found_books: list[dict]
     return book_to_remove
 
 
-def prompt_remove_copies(library: Library, book_to_remove: dict):
+def prompt_remove_copies(library: Library, book_to_remove: dict) -> Navigation:
     '''
     Ask the user if they want to remove the full book or just some copies.
      - If the user wants to remove the full book, remove it from the stock worksheet,
@@ -75,6 +75,7 @@ def prompt_remove_copies(library: Library, book_to_remove: dict):
     :param library: Library instance
     :param book: Book instance
     :param book_to_remove: dictionary of the selected book
+    :return: the next step of the menu loop
     '''
     clear_terminal()
     display_book(book_to_remove, table_title='You selected:')
@@ -87,7 +88,7 @@ def prompt_remove_copies(library: Library, book_to_remove: dict):
     menu.run()
     selected = menu.get_selected_code()
     if selected == 1:
-        logger.info(f'Removing the full book: {book_to_remove}')
+        logger.info('Removing the full book: %s', book_to_remove)
         try:
             library.remove_book(
                 book_to_remove, WorksheetSets.stock.value, totally=True
@@ -95,17 +96,16 @@ def prompt_remove_copies(library: Library, book_to_remove: dict):
         except Exception as e:
             print(f'{F.ERROR}Failed to remove the book.\nTry again{F.ENDC}')
             print(f'{F.ERROR}Restarting...{F.ENDC}')
-            logger.error(f'Failed to remove the book: {type(e)}: {e}')
-            library = library_init()
-            remove_book(library)
+            logger.error('Failed to remove the book: %s: %s', type(e), e)
+            return restart_after(e)
         else:
             print(f'{F.YELLOW}The Book has been completely removed{F.ENDC}\n')
             logger.info('Book has been completely removed')
-    if selected == 2:
-        remove_copies(library, book_to_remove)
+            return Navigation.main_menu
+    return remove_copies(library, book_to_remove)
 
 
-def remove_copies(library: Library, book_to_remove: dict):
+def remove_copies(library: Library, book_to_remove: dict) -> Navigation:
     '''
     Ask the user how many copies they want to remove.
     Remove the given number of book copies from the stock worksheet
@@ -113,6 +113,7 @@ def remove_copies(library: Library, book_to_remove: dict):
 
     :param library: Library instance
     :param book_to_remove: dictionary of the selected book
+    :return: the next step of the menu loop
     '''
     print(f'{F.HEADER}How many copies do you want to remove?{F.ENDC}')
 
@@ -126,7 +127,7 @@ def remove_copies(library: Library, book_to_remove: dict):
             print(f'{F.ERROR}Please enter a valid number{F.ENDC}')
         else:
             print('Removing....')
-            logger.info(f'Removing {copies_to_remove} copies of {book_to_remove}')
+            logger.info('Removing %s copies of %s', copies_to_remove, book_to_remove)
             try:
                 removed_book = library.remove_book(
                     book_to_remove, WorksheetSets.stock.value, copies_to_remove
@@ -134,13 +135,11 @@ def remove_copies(library: Library, book_to_remove: dict):
             except Exception as e:
                 print(f'{F.ERROR}Failed to remove the book.\nTry again{F.ENDC}')
                 print(f'{F.ERROR}Restarting...{F.ENDC}')
-                logger.error(f'Failed to remove the book: {type(e)}: {e}')
-                library = library_init()
-                remove_book(library)
+                logger.error('Failed to remove the book: %s: %s', type(e), e)
+                return restart_after(e)
             else:
                 show_updated_book(removed_book, copies_to_remove)
-
-            break
+                return Navigation.main_menu
 
 
 def show_updated_book(removed_book: dict | None, copies_to_remove: int):
@@ -158,13 +157,13 @@ def show_updated_book(removed_book: dict | None, copies_to_remove: int):
     else:
         clear_terminal()
         print(f'{F.YELLOW}Successfully removed {copies_to_remove} copies{F.ENDC}\n')
-        logger.info(f'Successfully removed {copies_to_remove} copies')
+        logger.info('Successfully removed %s copies', copies_to_remove)
         title = 'Updated book:'
         display_book(removed_book, table_title=title)
 
 
 # entry point for the remove book functionality
-def remove_book(library: Library):
+def remove_book(library: Library) -> Navigation:
     logger.info('Starting remove book functionality')
     book = Book()
 
@@ -181,16 +180,14 @@ def remove_book(library: Library):
     except Exception as e:
         print(f'{F.ERROR}Failed to search for the book.\nTry again{F.ENDC}')
         print(f'{F.ERROR}Restarting...{F.ENDC}')
-        logger.error(f'Failed to search for the book: {type(e)}: {e}')
-        library = library_init()
-        remove_book(library)
+        logger.error('Failed to search for the book: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         if not len(found_books):
             print(f'{F.ERROR}No books matching the {book_field.value}\n'
                   f'Try again...{F.ENDC}')
             time.sleep(3)
-            remove_book(library)
+            return Navigation.repeat
         else:
             book_to_remove = show_found_books(book, book_field, found_books)
-            prompt_remove_copies(library, book_to_remove)
-            back_to_menu(library)
+            return prompt_remove_copies(library, book_to_remove)
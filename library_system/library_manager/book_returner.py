@@ -2,13 +2,13 @@ import logging
 import time
 from rich import box
 
-from library_system.tools import library_init, clear_terminal, F
+from library_system.tools import clear_terminal, F
 from library_system.views.console_ui import Menu, get_book_input, display_book
 from library_system.views.menus import MenuSets
 from library_system.models.spreadsheet import Library
 from library_system.models.book import Book, BookFields, BorrowFields
 from library_system.models.worksheets_cfg import WorksheetSets
-from library_system.back_to_menu import back_to_menu
+from library_system.back_to_menu import Navigation, restart_after
 
 logger = logging.getLogger(__name__)
 
@@ -61,29 +61,30 @@ def show_found_books(book: Book, book_field: BookFields | BorrowFields, found_bo
     return book_to_return
 
 
-def return_book_to_stock(library: Library, book_to_return: dict):
+def return_book_to_stock(library: Library, book_to_return: dict) -> Navigation:
     '''
     Return the book to the library stock using the Library instance method `return_book`.
     Display the updated book details in the library stock using the `show_updated_book` function.
 
     :param library: Library instance
     :param book_to_return: dictionary with the book details
+    :return: the next step of the menu loop
     '''
     clear_terminal()
     title = 'You selected:'
     display_book(book_to_return, WorksheetSets.borrowed, table_title=title)
     print('Returning the book to the Library stock...\n')
-    logger.info(f'Returning the book to the Library stock: {book_to_return}')
+    logger.info('Returning the book to the Library stock: %s', book_to_return)
     try:
         upd_book = library.return_book(book_to_return)
     except Exception as e:
-        logger.error(f'Failed to return the book: {type(e).__name__}: {e}')
+        logger.error('Failed to return the book: %s: %s', type(e).__name__, e)
         print(f'{F.ERROR}Failed to return the book.\n Try again\n'
               f'Restarting...{F.ENDC}')
-        library = library_init()
-        return_book(library)
+        return restart_after(e)
     else:
         show_updated_book(upd_book)
+        return Navigation.main_menu
 
 
 def show_updated_book(updated_book: dict):
@@ -92,14 +93,14 @@ def show_updated_book(updated_book: dict):
 
     :param updated_book: dictionary with the updated book details
     '''
-    logger.info(f'The book was returned to the library stock: {updated_book}')
+    logger.info('The book was returned to the library stock: %s', updated_book)
     print(f'{F.YELLOW}The book was returned to the library stock.{F.ENDC}\n')
     title = 'The current book details in the library stock:'
     display_book(updated_book, table_title=title)
 
 
 # entry point for the return book functionality
-def return_book(library: Library):
+def return_book(library: Library) -> Navigation:
     logger.info('Running the return book functionality')
     book = Book(search_mode=True)
 
@@ -117,16 +118,14 @@ def return_book(library: Library):
     except Exception as e:
         print(f'{F.ERROR}Failed to search for the book.\nTry again\n'
               f'Restarting...{F.ENDC}')
-        logger.error(f'Failed to search for the book: {type(e)}: {e}')
-        library = library_init()
-        return_book(library)
+        logger.error('Failed to search for the book: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         if not len(found_books):
             print(f'{F.ERROR}No books matching the {borrow_field.value}\n'
                   f'Try again...{F.ENDC}')
             time.sleep(3)
-            return_book(library)
+            return Navigation.repeat
         else:
             book_to_return = show_found_books(book, borrow_field, found_books)
-            return_book_to_stock(library, book_to_return)
-            back_to_menu(library)
+            return return_book_to_stock(library, book_to_return)
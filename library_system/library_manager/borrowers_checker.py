@@ -4,26 +4,27 @@ import time
 from rich import box
 
 from library_system.views.console_ui import Menu
-from library_system.tools import clear_terminal, F, library_init
+from library_system.tools import clear_terminal, F
 from library_system.models.spreadsheet import Library
-from library_system.back_to_menu import back_to_menu
+from library_system.models.records import LoanRecord
+from library_system.back_to_menu import Navigation, restart_after
 
 
 logger = logging.getLogger(__name__)
 
 
-def display_overdue_borrowers(overdue_borrowers: list[dict]):
+def display_overdue_borrowers(overdue_borrowers: list[LoanRecord]):
     '''
     Display the overdue borrowers in a table.
 
-    param overdue_borrowers: list of overdue borrowers in the form of dictionaries
+    param overdue_borrowers: list of overdue borrowers in the form of LoanRecord instances
     '''
     clear_terminal()
     print(f'{F.YELLOW}Found {len(overdue_borrowers)} overdue borrowers{F.ENDC}\n')
     title = 'Showing all overdue borrowers'
 
     Menu.print_table(
-        overdue_borrowers,
+        [record.to_dict() for record in overdue_borrowers],
         box.ASCII_DOUBLE_HEAD,
         title,
         padding=(1, 1, 0, 1),
@@ -32,7 +33,7 @@ def display_overdue_borrowers(overdue_borrowers: list[dict]):
 
 
 # entry point for the checked_out viewer
-def check_overdue_borrowers(library: Library):
+def check_overdue_borrowers(library: Library) -> Navigation:
     '''
     Shows borrwers that have not returned the book on time
     '''
@@ -43,14 +44,12 @@ def check_overdue_borrowers(library: Library):
         overdue_borrowers = library.get_overdue_borrowers()
     except Exception as e:
         print(f'{F.ERROR}Failed to get the overdue borrowers.\nRestart the app and try again{F.ENDC}')
-        logger.error(f'Failed to get the overdue borrowers: {type(e)}: {e}')
-        library = library_init()
-        check_overdue_borrowers(library)
+        logger.error('Failed to get the overdue borrowers: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         if overdue_borrowers:
             display_overdue_borrowers(overdue_borrowers)
-            back_to_menu(library)
         else:
             clear_terminal()
             print(f'{F.YELLOW}No overdue borrowers found{F.ENDC}\n')
-            back_to_menu(library)
+        return Navigation.main_menu
@@ -0,0 +1,93 @@
+import logging
+
+from rich import box
+
+from library_system.config import METRICS_FILE
+from library_system.tools import clear_terminal, F
+from library_system.views.console_ui import Menu
+from library_system.models.spreadsheet import Library
+from library_system.models.metrics import metrics, LatencyHistogram
+from library_system.back_to_menu import Navigation
+
+
+logger = logging.getLogger(__name__)
+
+
+def latency_columns(histogram: LatencyHistogram) -> dict:
+    '''
+    Get the table columns of the latency histogram, the latency in milliseconds.
+    '''
+    stats = histogram.to_dict()
+    return {
+        'Calls': stats['calls'],
+        'Errors': stats['errors'],
+        'p50': stats['p50_ms'],
+        'p95': stats['p95_ms'],
+        'Max': stats['max_ms'],
+    }
+
+
+def display_operations():
+    '''
+    Display the time of the Library operations and the number of their storage calls.
+    '''
+    calls: dict[str, int] = {}
+    for (operation, _), histogram in dict(metrics.calls).items():
+        calls[operation] = calls.get(operation, 0) + histogram.count
+    rows = [
+        {'Operation': name} | latency_columns(histogram) | {'API calls': calls.get(name, 0)}
+        for name, histogram in sorted(dict(metrics.operations).items())
+    ]
+    if rows:
+        Menu.print_table(rows, box.ASCII_DOUBLE_HEAD, 'Operations, ms')
+
+
+def display_calls():
+    '''
+    Display the storage calls by operation and method.
+    '''
+    rows = [
+        {'Operation': operation, 'Method': method} | latency_columns(histogram)
+        for (operation, method), histogram in sorted(dict(metrics.calls).items())
+    ]
+    if rows:
+        Menu.print_table(rows, box.ASCII_DOUBLE_HEAD, 'API calls by operation, ms')
+
+
+def display_scheduler(library: Library):
+    '''
+    Display the Google Sheets requests waiting for the quota and the retries.
+    '''
+    stats = library.scheduler.stats()
+    rows = [
+        {
+            'Priority': priority,
+            'Requests': priority_stats['requests'],
+            'Waiting': stats['queue_depth'][priority],
+            'Delayed': priority_stats['waited'],
+            'Wait': round(priority_stats['wait_time'] * 1000, 1),
+            'Max wait': round(priority_stats['max_wait'] * 1000, 1),
+        }
+        for priority, priority_stats in stats['priorities'].items()
+    ]
+    Menu.print_table(rows, box.ASCII_DOUBLE_HEAD, f'Google Sheets quota, ms, {stats["retries"]} retries')
+
+
+# entry point for the diagnostics viewer
+def diagnostics(library: Library) -> Navigation:
+    '''
+    Shows the counters and the latency of the storage calls made in this session.
+    '''
+    logger.info('Viewing the diagnostics')
+    clear_terminal()
+    print(f'{F.YELLOW}DIAGNOSTICS{F.ENDC}\n')
+    if not metrics.enabled:
+        print('The storage calls are not recorded. Set the METRICS=1 environment variable and restart the app.\n')
+    elif not metrics.calls and not metrics.operations:
+        print('No storage calls recorded yet.\n')
+    else:
+        display_operations()
+        display_calls()
+        print(f'The metrics are saved to {METRICS_FILE} on exit.\n')
+    display_scheduler(library)
+    return Navigation.main_menu
@@ -2,13 +2,14 @@ import time
 from rich import box
 import logging
 
-from library_system.tools import clear_terminal, F, library_init
+from library_system.tools import clear_terminal, F
 from library_system.views.console_ui import Menu
 from library_system.views.menus import MenuSets
 from library_system.models.spreadsheet import Library
 from library_system.models.book import BookFields, BorrowFields
+from library_system.models.records import StockRecord, LoanRecord
 from library_system.models.worksheets_cfg import WorksheetSets, WorksheetSet
-from library_system.back_to_menu import back_to_menu
+from library_system.back_to_menu import Navigation, restart_after
 
 
 logger = logging.getLogger(__name__)
@@ -98,12 +99,12 @@ def get_sort_order(worksheet_set: WorksheetSet) -> bool:
 
 def display_stock(
         worksheet_set: WorksheetSet,
-        stock: list[dict],
+        stock: list[StockRecord] | list[LoanRecord],
         selected_field: BookFields | BorrowFields | None,
         sort_order: bool):
     '''
     Display the library stock in a table format using Menu.print_table() static method.
-    param stock: list of dicts with the book data
+    param stock: list of StockRecord or LoanRecord instances with the book data
     param selected_field: BookFields or BorrowFields attribute or None (if `Spreadsheet order` option is selected)
     param sort_order: False if ascending, True if descending
     '''
@@ -117,11 +118,12 @@ def display_stock(
     else:
         print(f'{F.YELLOW}Books sorted in the order they appear in the Spreadsheet "{worksheet_set["title"]}"{F.ENDC}')
 
-    Menu.print_table(stock, box.ASCII_DOUBLE_HEAD, expand=True, padding=(1, 1, 0, 1))
+    rows = [record.to_dict() for record in stock]
+    Menu.print_table(rows, box.ASCII_DOUBLE_HEAD, expand=True, padding=(1, 1, 0, 1))
 
 
 # entry point for the view library stock functionality
-def view_library_stocks(library: Library):
+def view_library_stocks(library: Library) -> Navigation:
     logger.info('Viewing the library stocks')
     display_header()
 
@@ -145,16 +147,14 @@ def view_library_stocks(library: Library):
         print(
             f'{F.ERROR}Failed to get the library stock.\nTry again{F.ENDC}'
         )
-        logger.error(f'Failed to get the library stock: {type(e)}: {e}')
-        library = library_init()
-        view_library_stocks(library)
+        logger.error('Failed to get the library stock: %s: %s', type(e), e)
+        return restart_after(e)
     else:
         time.sleep(2)
         if library_stock:
             display_stock(worksheet_set, library_stock,
                           selected_field, sort_order)
-            back_to_menu(library)
         else:
             clear_terminal()
             print(f'{F.YELLOW}No books found in the library stock{F.ENDC}\n')
-            back_to_menu(library)
+        return Navigation.main_menu
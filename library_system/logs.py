@@ -0,0 +1,252 @@
+'''
+Logging of the app.
+
+The log records are put to a bounded queue by the `DroppingQueueHandler` and handled
+by the `BatchingQueueListener` in a background thread, so the menu actions never wait for the log shipping:
+- `LogShipper` sends the records to Logtail in batches of `LOG_BATCH_SIZE` records
+  or every `LOG_FLUSH_INTERVAL` seconds, msgpack encoded and gzip compressed;
+- when Logtail is unreachable or `LOGTAIL_TOKEN` is not set, the records are written to the rotating `LOG_FILE`,
+  the upload is tried again after `LOG_RETRY_INTERVAL` seconds;
+- when the queue is full, the records are dropped following the `LOG_DROP_POLICY`.
+
+Pass the values as arguments of the log calls (`logger.info('Added the new book: %s', book)`) instead of f-strings,
+so the message is not built when the level is disabled.
+'''
+import atexit
+import copy
+import logging
+import queue
+import time
+from enum import Enum
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import TYPE_CHECKING
+
+from library_system.config import (
+    LOGTAIL_TOKEN, LOG_LEVEL, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_SIZE, LOG_DROP_POLICY,
+    LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS, LOG_RETRY_INTERVAL
+)
+
+if TYPE_CHECKING:
+    # imported on the first upload, see `LogShipper._upload`
+    import requests
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - [%(filename)s -> %(funcName)s() -> %(lineno)s]: %(message)s'
+LOG_DATE_FORMAT = '%d-%b-%y %H:%M'
+LOGTAIL_HOST = 'https://in.logtail.com'
+# seconds to wait for the Logtail response
+UPLOAD_TIMEOUT = 5
+
+
+class DropPolicies(Enum):
+    '''
+    Records dropped when the log queue is full.
+    '''
+    drop_new = 'drop_new'
+    drop_oldest = 'drop_oldest'
+
+
+class DroppingQueueHandler(QueueHandler):
+    '''
+    `QueueHandler` that never blocks the logging thread: when the queue is full,
+    the new or the oldest record is dropped following the `policy`.
+    The number of the dropped records is logged with the next record that fits in the queue.
+
+    :param log_queue: bounded queue of the records
+    :param policy: `DropPolicies` enum
+    '''
+
+    def __init__(self, log_queue: queue.Queue, policy: DropPolicies) -> None:
+        super().__init__(log_queue)
+        self.queue: queue.Queue = log_queue
+        self.policy = policy
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        '''
+        Merge the arguments into the message now, as they may change before the listener handles the record.
+        Unlike `QueueHandler.prepare`, the record is not formatted: the queue is in-process,
+        the listener handlers format it.
+        '''
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._unreported and not self.queue.full():
+            self.queue.put_nowait(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'Dropped {self._unreported} log records, the log queue is full',
+            }))
+            self._unreported = 0
+        if not self._put(record):
+            self.dropped += 1
+            self._unreported += 1
+
+    def _put(self, record: logging.LogRecord) -> bool:
+        '''
+        Put the record to the queue following the drop policy.
+
+        :return: `True` if the record is queued
+        '''
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            if self.policy != DropPolicies.drop_oldest:
+                return False
+        try:
+            self.queue.get_nowait()
+            self.queue.task_done()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            return False
+        # the oldest record was dropped instead
+        self.dropped += 1
+        self._unreported += 1
+        return True
+
+
+class BatchingQueueListener(QueueListener):
+    '''
+    `QueueListener` flushing its handlers when no record comes for `flush_interval` seconds,
+    so the batched records are not kept until the next log call.
+    '''
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, flush_interval: float) -> None:
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.queue: queue.Queue = log_queue
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+
+class LogShipper(logging.Handler):
+    '''
+    Handler sending the records to Logtail in batches.
+    The batch is sent when it has `batch_size` records or its first record waits for `flush_interval` seconds.
+    If the upload fails, the batch is written to the `fallback` handler
+    and the next uploads are not tried for `retry_interval` seconds.
+
+    :param token: Logtail source token, if None the records are written to the `fallback` handler only
+    :param fallback: handler of the records that can't be sent
+    :param batch_size: number of records sent by one request
+    :param flush_interval: number of seconds a record can wait in the batch
+    :param retry_interval: number of seconds to write to the `fallback` handler after a failed upload
+    :param compress: gzip the request body
+    '''
+
+    def __init__(
+            self,
+            token: str | None,
+            fallback: logging.Handler,
+            batch_size: int,
+            flush_interval: float,
+            retry_interval: float,
+            compress: bool = True
+    ) -> None:
+        super().__init__()
+        self.token = token
+        self.fallback = fallback
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.compress = compress
+        self._batch: list[logging.LogRecord] = []
+        self._first_at = 0.0
+        self._offline_until = 0.0
+        self._session: 'requests.Session | None' = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self._batch:
+            self._first_at = time.monotonic()
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size or time.monotonic() - self._first_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        if self.token and time.monotonic() >= self._offline_until:
+            try:
+                self._upload(batch)
+                return
+            except Exception as e:
+                self._offline_until = time.monotonic() + self.retry_interval
+                self.fallback.handle(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f'Failed to ship {len(batch)} log records to Logtail: {type(e).__name__}: {e}',
+                }))
+        for record in batch:
+            self.fallback.handle(record)
+
+    def _upload(self, batch: list[logging.LogRecord]) -> None:
+        '''
+        Send the records in one request, in the frame format of the Logtail client.
+        The HTTP libraries are imported on the first upload, by the listener thread.
+        '''
+        import gzip
+
+        import msgpack
+        import requests
+        from logtail.frame import create_frame
+        from logtail.helpers import DEFAULT_CONTEXT
+
+        session = self._session
+        if session is None:
+            session = self._session = requests.Session()
+        frames = [create_frame(record, self.format(record), DEFAULT_CONTEXT) for record in batch]
+        data = msgpack.packb(frames, use_bin_type=True)
+        headers = {'Authorization': f'Bearer {self.token}', 'Content-Type': 'application/msgpack'}
+        if self.compress:
+            data = gzip.compress(data)
+            headers['Content-Encoding'] = 'gzip'
+        response = session.post(LOGTAIL_HOST, data=data, headers=headers, timeout=UPLOAD_TIMEOUT)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self.flush()
+        self.fallback.close()
+        super().close()
+
+
+def setup_logging() -> BatchingQueueListener:
+    '''
+    Configure the root logger to put the records to the log queue
+    and start the listener shipping them in the background.
+    The remaining records are shipped when the app exits.
+
+    :return: started `BatchingQueueListener`
+    '''
+    formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+    # `delay`: the file is created only if a record is written to it
+    fallback = RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8', delay=True
+    )
+    fallback.setFormatter(formatter)
+    shipper = LogShipper(LOGTAIL_TOKEN, fallback, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_RETRY_INTERVAL)
+    shipper.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue, DropPolicies(LOG_DROP_POLICY))
+    logging.basicConfig(level=LOG_LEVEL, handlers=[queue_handler])
+
+    listener = BatchingQueueListener(log_queue, shipper, flush_interval=LOG_FLUSH_INTERVAL)
+    listener.start()
+
+    def stop_logging():
+        listener.stop()
+        shipper.close()
+    atexit.register(stop_logging)
+    return listener
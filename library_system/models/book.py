@@ -2,8 +2,8 @@ from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, validator
 from re import sub
-from dateutil.parser import parse
-from dateutil.parser import ParserError
+
+from library_system.models.dates import parse_date, format_date
 
 
 class BookFields(Enum):
@@ -143,13 +143,13 @@ class Book(BaseModel):
         if borrow_date is None:
             return borrow_date
         try:
-            borrow_date = parse(borrow_date, dayfirst=True)
-        except (ParserError, ValueError, OverflowError):
+            borrow_date = parse_date(borrow_date)
+        except ValueError:
             raise ValueError('Incorrect borrow date. Must be in one of the following formats:\n'
                              'dd-mm-yyyy or dd/mm/yyyy or dd.mm.yyyy.')
         if borrow_date > datetime.now():
             raise ValueError('Borrow date cannot be in the future.')
-        return datetime.strftime(borrow_date, '%d-%m-%Y')
+        return format_date(borrow_date)
 
     @validator('due_date')
     def validate_due_date(cls, due_date, values):
@@ -162,17 +162,17 @@ class Book(BaseModel):
             return due_date
 
         try:
-            due_date = parse(due_date, dayfirst=True)
-        except (ParserError, ValueError, OverflowError):
+            due_date = parse_date(due_date)
+        except ValueError:
             raise ValueError('Incorrect due date. Must be in one of the following formats:\n'
                              'dd-mm-yyyy or dd/mm/yyyy or dd.mm.yyyy.')
 
         # if search mode is on, skip the date in the future check
         if values.get('search_mode'):
-            return datetime.strftime(due_date, '%d-%m-%Y')
+            return format_date(due_date)
         if due_date <= datetime.now():
             raise ValueError('Due date must be in the future.')
-        return datetime.strftime(due_date, '%d-%m-%Y')
+        return format_date(due_date)
 
 
 # For testing purposes
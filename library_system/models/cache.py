@@ -0,0 +1,223 @@
+'''
+Read-through cache of the worksheets values.
+
+The `Library` keeps a `WorksheetSnapshot` (all rows of the worksheet including the header)
+for each worksheet and serves the views and searches from it until the snapshot expires.
+Writes made through the `Library` are applied to the snapshot as well, so it stays valid after them.
+The snapshot keeps the in-memory indexes of its columns, built on the first use and updated by the writes.
+'''
+import time
+from datetime import datetime
+from sys import intern
+from typing import TypeVar, cast
+
+from library_system.models.storage import cell_str, is_blank
+from library_system.models.indexes import RowMap, TrigramIndex, ValueIndex, DateIndex, ColumnIndex
+
+IndexType = TypeVar('IndexType', TrigramIndex, ValueIndex, DateIndex)
+
+
+class WorksheetSnapshot:
+    '''
+    Copy of all worksheet values taken at `loaded_at` time.
+    Rows are numbered from 1 as in the worksheet, row 1 is the header.
+
+    :param values: list of the worksheet rows, e.g. result of `get_all_values`
+    '''
+
+    def __init__(self, values: list[list[str]]) -> None:
+        # share the repeated strings, e.g. genres, authors and dates
+        for row in values:
+            row[:] = map(intern, row)
+        self.values = values
+        self.loaded_at = time.monotonic()
+        self._row_map: RowMap | None = None
+        self._indexes: dict[tuple[type[ColumnIndex], int], ColumnIndex] = {}
+        # sorted row numbers by sort keys, dropped on any change of the values
+        self.permutations: dict[tuple, list[int]] = {}
+
+    @property
+    def headers(self) -> list[str]:
+        return self.values[0] if self.values else []
+
+    def cell(self, row: int, col: int) -> str:
+        values = self.values[row - 1]
+        return values[col - 1] if col <= len(values) else ''
+
+    @property
+    def row_map(self) -> RowMap:
+        '''
+        `RowMap` of the rows below the header, the keys of the indexes are mapped to the row numbers by it.
+        '''
+        if self._row_map is None:
+            self._row_map = RowMap(2, max(len(self.values) - 1, 0))
+        return self._row_map
+
+    def _index(self, index_type: type[IndexType], col: int) -> IndexType:
+        '''
+        Get the index of the column, build it on the first use.
+
+        :param index_type: `TrigramIndex` for substring search, `ValueIndex` for exact match search
+        or `DateIndex` for date range search
+        :param col: column number
+        '''
+        index = self._indexes.get((index_type, col))
+        if index is None:
+            index = self._indexes[(index_type, col)] = index_type()
+            row_map = self.row_map
+            index.add_many((row_map.key(row), self.cell(row, col)) for row in range(2, len(self.values) + 1))
+        return cast(IndexType, index)
+
+    def trigram_index(self, col: int) -> TrigramIndex:
+        return self._index(TrigramIndex, col)
+
+    def value_index(self, col: int) -> ValueIndex:
+        return self._index(ValueIndex, col)
+
+    def date_index(self, col: int) -> DateIndex:
+        return self._index(DateIndex, col)
+
+    def search_substring(self, col: int, value: str) -> list[int] | None:
+        '''
+        Find the rows whose column contains the value (case insensitive) with the column `TrigramIndex`.
+
+        :return: sorted list of the row numbers or None if the value is too short to use the index
+        '''
+        keys = self.trigram_index(col).search(value)
+        if keys is None:
+            return None
+        return sorted(map(self.row_map.row, keys))
+
+    def search_value(self, col: int, value: str) -> list[int]:
+        '''
+        Find the rows whose column is equal to the value (case insensitive) with the column `ValueIndex`.
+
+        :return: sorted list of the row numbers
+        '''
+        return sorted(map(self.row_map.row, self.value_index(col).search(value)))
+
+    def search_dates(self, col: int, start: datetime | None = None, end: datetime | None = None) -> list[int]:
+        '''
+        Find the rows whose column date is in the range `start <= date < end` with the column `DateIndex`.
+
+        :return: list of the row numbers ordered by date
+        '''
+        return list(map(self.row_map.row, self.date_index(col).search(start, end)))
+
+    def update_cell(self, row: int, col: int, value) -> None:
+        if not 1 <= row <= len(self.values):
+            raise IndexError(f'Row {row} is out of the snapshot')
+        values = self.values[row - 1]
+        if len(values) < col:
+            values.extend([''] * (col - len(values)))
+        values[col - 1] = intern(cell_str(value))
+        self.permutations.clear()
+        indexes = [index for (_, index_col), index in self._indexes.items() if index_col == col]
+        if indexes and row > 1:
+            key = self.row_map.key(row)
+            for index in indexes:
+                index.remove(key)
+                index.add(key, values[col - 1])
+
+    def append_row(self, values: list) -> None:
+        width = len(self.headers)
+        row = [intern(cell_str(value)) for value in values]
+        self.values.append(row + [''] * (width - len(row)))
+        self.permutations.clear()
+        if self._row_map is not None:
+            key = self._row_map.append()
+            for (_, col), index in self._indexes.items():
+                index.add(key, self.cell(len(self.values), col))
+
+    def clear_row(self, row: int) -> None:
+        if not 1 < row <= len(self.values):
+            raise IndexError(f'Row {row} is out of the snapshot')
+        self.values[row - 1] = [''] * len(self.values[row - 1])
+        self.permutations.clear()
+        if self._row_map is not None:
+            key = self._row_map.key(row)
+            for index in self._indexes.values():
+                index.remove(key)
+        # the trailing empty rows are not returned by the worksheet, the next row is appended in their place
+        while len(self.values) > 1 and is_blank(self.values[-1]):
+            self.delete_row(len(self.values))
+
+    def delete_row(self, row: int) -> None:
+        if not 1 < row <= len(self.values):
+            raise IndexError(f'Row {row} is out of the snapshot')
+        del self.values[row - 1]
+        self.permutations.clear()
+        if self._row_map is not None:
+            key = self._row_map.delete(row)
+            for index in self._indexes.values():
+                index.remove(key)
+
+
+class SnapshotCache:
+    '''
+    Worksheets snapshots by worksheet title.
+
+    :param ttl: number of seconds a snapshot is valid, `0` disables the cache
+    '''
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._snapshots: dict[str, WorksheetSnapshot] = {}
+
+    def get(self, title: str) -> WorksheetSnapshot | None:
+        '''
+        Get the snapshot of the worksheet if it's not expired.
+        '''
+        snapshot = self._snapshots.get(title)
+        if snapshot is None:
+            return None
+        if time.monotonic() - snapshot.loaded_at > self.ttl:
+            del self._snapshots[title]
+            return None
+        return snapshot
+
+    def put(self, title: str, values: list[list[str]]) -> WorksheetSnapshot:
+        '''
+        Store the worksheet values as a new snapshot.
+        '''
+        snapshot = WorksheetSnapshot(values)
+        if self.ttl > 0:
+            self._snapshots[title] = snapshot
+        return snapshot
+
+    def invalidate(self, title: str | None = None) -> None:
+        '''
+        Drop the snapshot of the worksheet or all snapshots if `title` is None.
+        '''
+        if title is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(title, None)
+
+    def update_cell(self, title: str, row: int, col: int, value) -> None:
+        '''Apply a cell update to the snapshot of the worksheet if it's cached.'''
+        self._apply(title, 'update_cell', row, col, value)
+
+    def append_row(self, title: str, values: list) -> None:
+        '''Apply an appended row to the snapshot of the worksheet if it's cached.'''
+        self._apply(title, 'append_row', values)
+
+    def clear_row(self, title: str, row: int) -> None:
+        '''Apply a row clearing to the snapshot of the worksheet if it's cached.'''
+        self._apply(title, 'clear_row', row)
+
+    def delete_row(self, title: str, row: int) -> None:
+        '''Apply a row deletion to the snapshot of the worksheet if it's cached.'''
+        self._apply(title, 'delete_row', row)
+
+    def _apply(self, title: str, method: str, *args) -> None:
+        '''
+        Call the snapshot `method`, drop the snapshot if the change cannot be applied to it.
+        '''
+        snapshot = self._snapshots.get(title)
+        if snapshot is None:
+            return
+        try:
+            getattr(snapshot, method)(*args)
+        except IndexError:
+            self.invalidate(title)
@@ -0,0 +1,59 @@
+'''
+Parsing of the borrow and due dates.
+
+The app writes the dates in the `dd-mm-yyyy` format, so the dates in the worksheets
+are parsed by a precompiled regex first and by the `dateutil` parser only if that fails,
+`dateutil` is imported on the first fallback.
+The results are memoized, as the same dates repeat a lot in the `borrowed` worksheet.
+'''
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# format of the dates written to the worksheets
+DATE_FORMAT = '%d-%m-%Y'
+
+# dd-mm-yyyy, dd/mm/yyyy or dd.mm.yyyy
+_DATE_RE = re.compile(r'(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})')
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value: str) -> datetime | None:
+    '''
+    Parse the date string, return None if it's not a valid date.
+    '''
+    match = _DATE_RE.fullmatch(value.strip())
+    if match:
+        day, month, year = match.groups()
+        try:
+            return datetime(int(year), int(month), int(day))
+        except ValueError:
+            # e.g. mm-dd-yyyy, let dateutil decide
+            pass
+    from dateutil.parser import parse, ParserError
+
+    try:
+        return parse(value, dayfirst=True)
+    except (ParserError, ValueError, OverflowError):
+        return None
+
+
+def parse_date(value: str) -> datetime:
+    '''
+    Parse the date string the same way as `dateutil.parser.parse(value, dayfirst=True)`.
+
+    :param value: date string, e.g. `25-02-2023`
+    :return: `datetime` instance
+    :raise ValueError: if the value is not a valid date
+    '''
+    date = _parse_date(value)
+    if date is None:
+        raise ValueError(f'Incorrect date <{value}>')
+    return date
+
+
+def format_date(date: datetime) -> str:
+    '''
+    Format the date as it's written to the worksheets: `dd-mm-yyyy`.
+    '''
+    return datetime.strftime(date, DATE_FORMAT)
@@ -0,0 +1,222 @@
+'''
+In-memory indexes of the worksheet snapshot columns.
+
+Indexes refer to the rows by stable keys given by the `RowMap` of the snapshot,
+so deleting a row doesn't require renumbering the rows below it in every index.
+'''
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Iterable
+
+from library_system.models.dates import parse_date
+
+# characters that make a search value a regular expression rather than a literal substring
+REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+
+def is_literal(value: str) -> bool:
+    '''
+    Check if the search value has no regular expression special characters.
+    '''
+    return REGEX_CHARS.isdisjoint(value)
+
+
+class RowMap:
+    '''
+    Maps stable row keys to the current worksheet row numbers.
+    Keys are given in the row order starting from `first_row`: initially the key of a row is its number.
+    Deleted keys are kept in a sorted list and the row number of a key is shifted by the deleted keys before it.
+
+    :param first_row: number of the first indexed row (the row below the header)
+    :param rows: initial number of the indexed rows
+    '''
+
+    def __init__(self, first_row: int = 2, rows: int = 0) -> None:
+        self._first_row = first_row
+        self._next_key = first_row + rows
+        self._deleted: list[int] = []
+
+    def __len__(self) -> int:
+        return self._next_key - self._first_row - len(self._deleted)
+
+    def row(self, key: int) -> int:
+        '''
+        Get the current row number of the key.
+        '''
+        return key - bisect_right(self._deleted, key)
+
+    def key(self, row: int) -> int:
+        '''
+        Get the key of the current row number.
+        '''
+        if not self._first_row <= row < self._first_row + len(self):
+            raise IndexError(f'Row {row} is out of the indexed rows')
+        # the smallest key that has `row` live keys up to it (counting from the first row)
+        low, high = row, row + len(self._deleted)
+        while low < high:
+            middle = (low + high) // 2
+            if middle - bisect_right(self._deleted, middle) < row:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def append(self) -> int:
+        '''
+        Add a row after the last row, return its key.
+        '''
+        key = self._next_key
+        self._next_key += 1
+        return key
+
+    def delete(self, row: int) -> int:
+        '''
+        Delete the row, the rows below it are shifted up. Return the key of the deleted row.
+        '''
+        key = self.key(row)
+        insort(self._deleted, key)
+        return key
+
+
+def trigrams(value: str) -> set[str]:
+    '''
+    Get the set of 3-character substrings of the value.
+    '''
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class TrigramIndex:
+    '''
+    Inverted index of the column values trigrams for case insensitive substring search.
+    '''
+    MIN_QUERY = 3
+
+    def __init__(self) -> None:
+        self._postings: dict[str, set[int]] = {}
+        self._values: dict[int, str] = {}
+
+    def add(self, key: int, value: str) -> None:
+        value = value.lower()
+        self._values[key] = value
+        for gram in trigrams(value):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def add_many(self, items: Iterable[tuple[int, str]]) -> None:
+        for key, value in items:
+            self.add(key, value)
+
+    def remove(self, key: int) -> None:
+        value = self._values.pop(key, None)
+        if value is None:
+            return
+        for gram in trigrams(value):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def search(self, query: str) -> list[int] | None:
+        '''
+        Get the keys of the values containing the query (case insensitive).
+
+        :return: list of keys or None if the query is too short to use the index
+        '''
+        query = query.lower()
+        if len(query) < self.MIN_QUERY:
+            return None
+        # intersect the postings starting from the smallest one
+        postings = sorted((self._postings.get(gram, set()) for gram in trigrams(query)), key=len)
+        keys = set(postings[0])
+        for posting in postings[1:]:
+            if not keys:
+                break
+            keys &= posting
+        # the trigrams may come from different places of the value
+        return [key for key in keys if query in self._values[key]]
+
+
+class ValueIndex:
+    '''
+    Hash index of the column values for case insensitive exact match search.
+    '''
+
+    def __init__(self) -> None:
+        self._keys: dict[str, set[int]] = {}
+        self._values: dict[int, str] = {}
+
+    def add(self, key: int, value: str) -> None:
+        value = value.lower()
+        self._values[key] = value
+        self._keys.setdefault(value, set()).add(key)
+
+    def add_many(self, items: Iterable[tuple[int, str]]) -> None:
+        for key, value in items:
+            self.add(key, value)
+
+    def remove(self, key: int) -> None:
+        value = self._values.pop(key, None)
+        if value is None:
+            return
+        keys = self._keys[value]
+        keys.discard(key)
+        if not keys:
+            del self._keys[value]
+
+    def search(self, query: str) -> list[int]:
+        '''
+        Get the keys of the values equal to the query (case insensitive).
+        '''
+        return list(self._keys.get(query.lower(), ()))
+
+
+class DateIndex:
+    '''
+    Index of the column dates ordered by date for date range queries.
+    Values that are not valid dates are not indexed.
+    '''
+
+    def __init__(self) -> None:
+        # sorted (date, key) pairs, the keys of the same date are in the row order
+        self._entries: list[tuple[datetime, int]] = []
+        self._dates: dict[int, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: int, value: str) -> None:
+        try:
+            date = parse_date(value)
+        except ValueError:
+            return
+        self._dates[key] = date
+        insort(self._entries, (date, key))
+
+    def add_many(self, items: Iterable[tuple[int, str]]) -> None:
+        for key, value in items:
+            try:
+                self._dates[key] = parse_date(value)
+            except ValueError:
+                pass
+        self._entries = sorted((date, key) for key, date in self._dates.items())
+
+    def remove(self, key: int) -> None:
+        date = self._dates.pop(key, None)
+        if date is None:
+            return
+        del self._entries[bisect_left(self._entries, (date, key))]
+
+    def search(self, start: datetime | None = None, end: datetime | None = None) -> list[int]:
+        '''
+        Get the keys of the dates in the range `start <= date < end` ordered by date.
+
+        :param start: start of the range, None for no lower bound
+        :param end: end of the range (excluded), None for no upper bound
+        '''
+        low = 0 if start is None else bisect_left(self._entries, (start,))
+        high = len(self._entries) if end is None else bisect_left(self._entries, (end,))
+        return [key for _, key in self._entries[low:high]]
+
+
+# column index types kept by the snapshot
+ColumnIndex = TrigramIndex | ValueIndex | DateIndex
@@ -0,0 +1,202 @@
+'''
+Metrics of the storage calls.
+
+When `METRICS` is set, every call of the storages (`GSheetStorage`, `MemoryStorage`, `SQLiteStorage`
+and their worksheets) is counted and timed, grouped by the `Library` operation making it
+(`search_books`, `return_book`, ...) and by the storage method (`get_all_values`, `apply_batch`, ...).
+The time of a Google Sheets call includes its wait for the quota and its retries.
+Calls made by nested operations are counted for the outermost one, e.g. the `search_books` call of `return_book`.
+
+The metrics are shown by the "Diagnostics" option of the Main Menu and dumped to `METRICS_FILE` on exit.
+When `METRICS` is not set, the decorators only check the `enabled` flag.
+'''
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from library_system.config import METRICS
+
+# upper bounds of the latency histogram buckets in milliseconds, the last bucket has no upper bound
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+# name of the calls made outside of the `Library` operations, e.g. on startup
+NO_OPERATION = '-'
+
+
+class LatencyHistogram:
+    '''
+    Number of the calls by latency bucket, total and max latency and number of errors.
+    '''
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float, error: bool = False) -> None:
+        self.counts[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        '''
+        Get the upper bound in seconds of the bucket holding the percentile,
+        but no more than the max latency.
+        '''
+        rank = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(BUCKETS_MS[bucket] / 1000, self.max) if bucket < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 1),
+            'mean_ms': round(self.total * 1000 / self.count, 1) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 1),
+            'p95_ms': round(self.percentile(95) * 1000, 1),
+            'max_ms': round(self.max * 1000, 1),
+            'buckets_ms': {
+                (f'<={bound}' if bucket < len(BUCKETS_MS) else f'>{BUCKETS_MS[-1]}'): count
+                for bucket, (bound, count) in enumerate(zip(BUCKETS_MS + (None,), self.counts)) if count
+            },
+        }
+
+
+class Metrics:
+    '''
+    Counters and latency histograms of the storage calls.
+
+    :param enabled: record the calls
+    :param `operations`: histograms of the `Library` operations time by operation name
+    :param `calls`: histograms of the storage calls by operation name and method name
+    '''
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.started = time.time()
+        self.operations: dict[str, LatencyHistogram] = {}
+        self.calls: dict[tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def current_operation(self) -> str | None:
+        '''
+        Name of the outermost operation running in the current thread.
+        '''
+        return getattr(self._local, 'operation', None)
+
+    @contextmanager
+    def operation(self, name: str):
+        '''
+        Context manager recording the time of the operation,
+        the storage calls made inside the block are counted for it.
+        '''
+        if not self.enabled or self.current_operation is not None:
+            yield
+            return
+        self._local.operation = name
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self._local.operation = None
+            with self._lock:
+                self.operations.setdefault(name, LatencyHistogram()).add(time.perf_counter() - start, error)
+
+    def record(self, method: str, seconds: float, error: bool = False) -> None:
+        '''
+        Record the storage call of the current operation.
+        '''
+        key = (self.current_operation or NO_OPERATION, method)
+        with self._lock:
+            self.calls.setdefault(key, LatencyHistogram()).add(seconds, error)
+
+    def by_method(self) -> dict[str, LatencyHistogram]:
+        '''
+        Get the histograms of the storage calls by method name for all the operations.
+        '''
+        methods: dict[str, LatencyHistogram] = {}
+        with self._lock:
+            for (_, method), histogram in self.calls.items():
+                total = methods.setdefault(method, LatencyHistogram())
+                total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+                total.count += histogram.count
+                total.errors += histogram.errors
+                total.total += histogram.total
+                total.max = max(total.max, histogram.max)
+        return methods
+
+    def to_dict(self) -> dict:
+        '''
+        Get the metrics as a JSON serializable dict.
+        '''
+        methods = self.by_method()
+        with self._lock:
+            return {
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'operations': {name: histogram.to_dict() for name, histogram in self.operations.items()},
+                'calls': {
+                    operation: {
+                        method: histogram.to_dict() for (op, method), histogram in self.calls.items()
+                        if op == operation
+                    }
+                    for operation in dict.fromkeys(op for op, _ in self.calls)
+                },
+                'methods': {name: histogram.to_dict() for name, histogram in methods.items()},
+            }
+
+    def dump(self, path: str) -> None:
+        '''
+        Write the metrics to the JSON file, if any call was recorded.
+        '''
+        if not self.calls and not self.operations:
+            return
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+# metrics of the app
+metrics = Metrics(METRICS)
+
+
+def measured(func):
+    '''
+    Decorator of the `Library` operations: the storage calls made by the function are counted for it.
+    '''
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+        with metrics.operation(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def timed_call(method: str, func, *args, **kwargs):
+    '''
+    Make the storage call and record its time as a call of the `method`.
+    '''
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except BaseException:
+        metrics.record(method, time.perf_counter() - start, error=True)
+        raise
+    metrics.record(method, time.perf_counter() - start)
+    return result
@@ -0,0 +1,118 @@
+'''
+Compact records of the worksheet rows.
+
+The rows read by the `Library` are returned as `StockRecord` and `LoanRecord` instances
+instead of dicts: the fields are stored in `__slots__`, numbers and dates are parsed once
+when the record is built, repeated strings are shared with the interned snapshot values.
+Use `to_dict` to get the gspread `get_all_records` like dict of the row for the views.
+'''
+from datetime import datetime
+
+from library_system.models.book import BookFields, BorrowFields
+from library_system.models.dates import parse_date
+from library_system.models.worksheets_cfg import WorksheetSets, WorksheetSet
+
+
+class Record:
+    '''
+    Base class of the worksheet row records.
+
+    Class attributes:
+    :param `FIELDS`: names of the row fields, in the worksheet order.
+
+    Instance attributes:
+    :param `cell_row`: row number of the record in the worksheet.
+    '''
+    __slots__ = ('cell_row',)
+    FIELDS: tuple[str, ...] = ()
+
+    def __init__(self, cell_row: int, **values) -> None:
+        self.cell_row = cell_row
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field, ''))
+
+    @classmethod
+    def from_row(cls, row: list[str], cols: list[int], cell_row: int):
+        '''
+        Build the record from the worksheet row.
+        Values are converted like in the gspread `get_all_records` dicts: numbers to int or float.
+
+        :param row: list of the row values
+        :param cols: column number of each field of `FIELDS`
+        :param cell_row: row number in the worksheet
+        '''
+        from gspread.utils import numericise
+
+        values = {
+            field: numericise(row[col - 1] if col <= len(row) else '') for field, col in zip(cls.FIELDS, cols)
+        }
+        return cls(cell_row, **values)
+
+    def to_dict(self) -> dict:
+        '''
+        Get the dict of the record fields and its `cell_row`.
+        '''
+        record = {field: getattr(self, field) for field in self.FIELDS}
+        record['cell_row'] = self.cell_row
+        return record
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()})'
+
+
+class StockRecord(Record):
+    '''
+    Record of a book in the `stock` worksheet.
+    '''
+    __slots__ = tuple(field.name for field in BookFields)
+    FIELDS = __slots__
+
+    isbn: int | str
+    title: str
+    author: str
+    genre: str
+    year: int | str
+    copies: int | str
+
+
+class LoanRecord(Record):
+    '''
+    Record of a borrowed book in the `borrowed` worksheet.
+
+    :param `borrowed_on`: parsed `borrow_date` or None if it's not a valid date.
+    :param `due_on`: parsed `due_date` or None if it's not a valid date.
+    '''
+    FIELDS = tuple(field.name for field in BorrowFields)
+    __slots__ = FIELDS + ('borrowed_on', 'due_on')
+
+    isbn: int | str
+    title: str
+    author: str
+    genre: str
+    year: int | str
+    borrower_name: str
+    borrow_date: str
+    due_date: str
+    borrowed_on: datetime | None
+    due_on: datetime | None
+
+    def __init__(self, cell_row: int, **values) -> None:
+        super().__init__(cell_row, **values)
+        self.borrowed_on = _parse_or_none(self.borrow_date)
+        self.due_on = _parse_or_none(self.due_date)
+
+
+def _parse_or_none(value) -> datetime | None:
+    try:
+        return parse_date(str(value))
+    except ValueError:
+        return None
+
+
+def record_type(w_set: WorksheetSet) -> type[StockRecord] | type[LoanRecord]:
+    '''
+    Get the record class of the worksheet.
+    '''
+    if w_set['title'] == WorksheetSets.borrowed.value['title']:
+        return LoanRecord
+    return StockRecord
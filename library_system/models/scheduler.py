@@ -0,0 +1,266 @@
+'''
+Scheduler of the Google Sheets API requests.
+
+Every request of the `GSheetWorksheet` and `GSheetStorage` goes through the `RequestScheduler`:
+- the request takes a token from the read or the write `TokenBucket`, so the app stays in the per minute quotas
+  of the Sheets API instead of getting `429` errors, and waits if the bucket is empty;
+- a request failed with a rate limit (`429`) error, or a read failed with a server (`5xx`) error,
+  is retried with a jittered exponential backoff;
+- interactive requests (search, check out, ...) go first: background requests (export, import, compaction)
+  wait while any interactive request is waiting and leave a reserve of the tokens to the interactive ones.
+
+The queue depth, the wait times and the retries are counted in `stats`.
+'''
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# statuses of the responses that are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# waits longer than this number of seconds are logged
+SLOW_WAIT = 1.0
+
+
+class Priority(IntEnum):
+    '''
+    Priority of the requests, the lower value goes first.
+    '''
+    interactive = 0
+    background = 1
+
+
+class RequestKinds(IntEnum):
+    '''
+    Sheets API quota groups of the requests.
+    '''
+    read = 0
+    write = 1
+
+
+class TokenBucket:
+    '''
+    Token bucket rate limiter.
+    Starts full, holds up to `capacity` tokens and gets `rate` tokens per second.
+
+    :param rate: number of tokens added per second
+    :param capacity: maximum number of tokens, i.e. the burst size
+    :param clock: monotonic clock function
+    '''
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    @classmethod
+    def per_minute(cls, quota: int, burst: int, clock: Callable[[], float] = time.monotonic) -> 'TokenBucket':
+        '''
+        Get the bucket that never exceeds `quota` requests in any 60 seconds window:
+        `burst` requests can be sent at once and the rest of the quota is spread over the minute.
+        '''
+        burst = max(1, min(burst, quota - 1))
+        return cls(max(1, quota - burst) / 60, burst, clock)
+
+    @property
+    def tokens(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    def take(self, reserve: float = 0) -> float:
+        '''
+        Take a token if more than `reserve` tokens are available.
+
+        :param reserve: number of tokens that have to stay in the bucket
+        :return: 0 if the token is taken, otherwise the number of seconds to wait before the next try
+        '''
+        tokens = self.tokens
+        # tolerate the rounding of the refill, the wait for a tiny remainder may not advance the clock
+        if tokens - reserve >= 1 - 1e-9:
+            self._tokens = max(0.0, tokens - 1)
+            return 0
+        return (reserve + 1 - tokens) / self.rate
+
+
+class RequestScheduler:
+    '''
+    Rate limiting, retries and priorities of the storage requests.
+
+    :param read_quota: number of read requests allowed per minute
+    :param write_quota: number of write requests allowed per minute
+    :param burst: number of requests of each kind that can be sent at once
+    :param retries: number of retries of a failed request
+    :param backoff_max: maximum number of seconds between the retries
+    :param background_reserve: share of the bucket tokens background requests can't use
+    :param clock: monotonic clock function
+    :param sleep: sleep function
+    '''
+
+    def __init__(
+            self,
+            read_quota: int,
+            write_quota: int,
+            burst: int = 10,
+            retries: int = 5,
+            backoff_max: float = 32,
+            background_reserve: float = 0.2,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        self._buckets = {
+            RequestKinds.read: TokenBucket.per_minute(read_quota, burst, clock),
+            RequestKinds.write: TokenBucket.per_minute(write_quota, burst, clock),
+        }
+        self.retries = retries
+        self.backoff_max = backoff_max
+        self.background_reserve = background_reserve
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # number of the requests waiting for a token by priority
+        self._waiting = {priority: 0 for priority in Priority}
+        self._stats = {
+            priority: {'requests': 0, 'waited': 0, 'wait_time': 0.0, 'max_wait': 0.0} for priority in Priority
+        }
+        self._retried = 0
+
+    @property
+    def current_priority(self) -> Priority:
+        '''
+        Priority of the requests made by the current thread, `interactive` by default.
+        '''
+        return getattr(self._local, 'priority', Priority.interactive)
+
+    @contextmanager
+    def priority(self, priority: Priority):
+        '''
+        Context manager setting the priority of the requests made inside the block.
+        '''
+        previous = self.current_priority
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    @property
+    def queue_depth(self) -> dict[str, int]:
+        '''
+        Number of the requests waiting for a token by priority name.
+        '''
+        return {priority.name: waiting for priority, waiting in self._waiting.items()}
+
+    def stats(self) -> dict:
+        '''
+        Get the counters of the scheduled requests:
+        queue depth, number of requests, number of delayed requests, total and max wait seconds by priority
+        and the number of retries.
+        '''
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'priorities': {priority.name: dict(stats) for priority, stats in self._stats.items()},
+                'retries': self._retried,
+            }
+
+    def _acquire(self, kind: RequestKinds, priority: Priority) -> float:
+        '''
+        Wait for a token of the `kind` bucket.
+
+        :return: number of seconds waited
+        '''
+        bucket = self._buckets[kind]
+        reserve = bucket.capacity * self.background_reserve if priority == Priority.background else 0
+        start = self._clock()
+        slept = False
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._lock:
+                    if priority == Priority.background and self._waiting[Priority.interactive]:
+                        # let the waiting interactive requests take the tokens first
+                        wait = 1 / bucket.rate
+                    else:
+                        wait = bucket.take(reserve)
+                if not wait:
+                    break
+                slept = True
+                self._sleep(wait)
+        finally:
+            waited = self._clock() - start if slept else 0.0
+            with self._lock:
+                self._waiting[priority] -= 1
+                stats = self._stats[priority]
+                stats['requests'] += 1
+                if slept:
+                    stats['waited'] += 1
+                    stats['wait_time'] += waited
+                    stats['max_wait'] = max(stats['max_wait'], waited)
+        if waited > SLOW_WAIT:
+            # throttling is expected for the background work, but the user is waiting for an interactive request
+            log = logger.warning if priority == Priority.interactive else logger.debug
+            log('%s %s request waited %.1fs for the quota', priority.name.capitalize(), kind.name, waited)
+        return waited
+
+    def backoff(self, attempt: int) -> float:
+        '''
+        Get the number of seconds to wait before the retry `attempt` (from 0):
+        random value up to `2 ** attempt` seconds, but no more than `backoff_max`.
+        '''
+        return random.uniform(0, min(self.backoff_max, 2 ** attempt))
+
+    @staticmethod
+    def is_retryable(error: Exception, kind: RequestKinds) -> bool:
+        '''
+        Check if the failed request can be sent again.
+        Reads are retried on the rate limit, server and connection errors.
+        Writes are retried only on the rate limit error: the rejected request is not applied,
+        while after a server error an appended row may already be in the worksheet.
+        '''
+        import gspread as gs
+        import requests
+
+        if isinstance(error, gs.exceptions.APIError):
+            status = error.response.status_code
+            return status == 429 or (kind == RequestKinds.read and status in RETRY_STATUSES)
+        return kind == RequestKinds.read and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def call(self, kind: RequestKinds, func: Callable[..., T], *args, **kwargs) -> T:
+        '''
+        Send the request when the quota allows it and retry it if it fails with a retryable error.
+
+        :param kind: `RequestKinds` quota group of the request
+        :param func: function making the request
+        :return: result of the function
+        '''
+        priority = self.current_priority
+        attempt = 0
+        while True:
+            self._acquire(kind, priority)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.retries or not self.is_retryable(e, kind):
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                with self._lock:
+                    self._retried += 1
+                logger.warning(
+                    '%s request failed: %s: %s. Retry %s/%s in %.1fs',
+                    kind.name.capitalize(), type(e).__name__, e, attempt, self.retries, delay
+                )
+                self._sleep(delay)
@@ -0,0 +1,126 @@
+'''
+Sorting of the worksheet rows by one or more fields.
+
+The typed sort key of each value is computed once per sort, the rows are sorted by
+the keys from the last field to the first one with the stable sort, so the rows with
+equal keys keep the worksheet order. For the first `limit` rows `heapq` is used instead of a full sort.
+'''
+import heapq
+from datetime import datetime
+from typing import Callable, Iterable
+
+from library_system.models.book import BookFields, BorrowFields
+from library_system.models.dates import parse_date
+
+# field name and descending order flag
+SortKey = tuple[str, bool]
+
+DATE_FIELDS = (BorrowFields.borrow_date.name, BorrowFields.due_date.name)
+INT_FIELDS = (BookFields.isbn.name, BookFields.copies.name, BookFields.year.name)
+
+
+def sort_key(field: str, reverse: bool = False) -> Callable[[str | int | float], datetime | int | float | str]:
+    '''
+    Get the function of the typed sort key of the field value:
+    - dates are sorted by date, invalid dates are put at the end of the list;
+    - `isbn`, `copies` and `year` are sorted by int value, invalid ints are put at the end of the list;
+    - any other field is sorted by string value.
+
+    :param field: field name
+    :param reverse: the key is used for a descending sort
+    :return: key function
+    '''
+    if field in DATE_FIELDS:
+        invalid_date = datetime.min if reverse else datetime.max
+
+        def date_key(value):
+            try:
+                return parse_date(str(value))
+            except ValueError:
+                return invalid_date
+        return date_key
+
+    if field in INT_FIELDS:
+        invalid_int = float('-inf') if reverse else float('inf')
+
+        def int_key(value):
+            try:
+                return int(value)
+            except (ValueError, OverflowError):
+                return invalid_int
+        return int_key
+
+    return str
+
+
+def cell_key(field: str, reverse: bool = False) -> Callable[[str], datetime | int | float | str]:
+    '''
+    Get the function of the typed sort key of the raw worksheet cell value,
+    the value is converted like in the gspread `get_all_records` dicts first.
+    '''
+    # gspread is imported by the sorts, the other backends don't load it at startup
+    from gspread.utils import numericise
+
+    key = sort_key(field, reverse)
+    return lambda value: key(numericise(value))
+
+
+def sort_rows(rows: list[int], columns: list[list], directions: list[bool]) -> list[int]:
+    '''
+    Sort the rows by the typed keys of the columns.
+
+    :param rows: row numbers (or indexes) in the original order
+    :param columns: the sort keys of the rows for each field, `columns[i][j]` is the key of `rows[j]`
+    :param directions: descending order flag of each field
+    :return: sorted row numbers
+    '''
+    order = list(range(len(rows)))
+    # stable sort by the least significant field first
+    for keys, reverse in reversed(list(zip(columns, directions))):
+        order.sort(key=keys.__getitem__, reverse=reverse)
+    return [rows[i] for i in order]
+
+
+def top_rows(rows: list[int], columns: list[list], directions: list[bool], limit: int) -> list[int]:
+    '''
+    Get the first `limit` rows of `sort_rows` result.
+    `heapq` is used if all the fields are sorted in the same direction.
+    '''
+    if limit >= len(rows) or len(set(directions)) > 1:
+        return sort_rows(rows, columns, directions)[:limit]
+    if len(columns) == 1:
+        key = columns[0].__getitem__
+    else:
+        def key(i):
+            return tuple(keys[i] for keys in columns)
+    select = heapq.nlargest if directions[0] else heapq.nsmallest
+    return [rows[i] for i in select(limit, range(len(rows)), key=key)]
+
+
+def sort_values(
+        values: list[list[str]],
+        rows: list[int],
+        cols: Iterable[int],
+        sort_keys: Iterable[SortKey],
+        limit: int | None = None
+) -> list[int]:
+    '''
+    Sort the worksheet rows by the fields.
+
+    :param values: worksheet values, the first row is the header
+    :param rows: numbers of the rows to sort
+    :param cols: column number of each sort field
+    :param sort_keys: `SortKey` of each sort field
+    :param limit: return only the first rows
+    :return: sorted row numbers
+    '''
+    columns = []
+    directions = []
+    for col, (field, reverse) in zip(cols, sort_keys):
+        key = cell_key(field, reverse)
+        cells = (values[row - 1][col - 1] if col <= len(values[row - 1]) else '' for row in rows)
+        columns.append([key(cell) for cell in cells])
+        directions.append(reverse)
+    if limit is not None:
+        return top_rows(rows, columns, directions, limit)
+    return sort_rows(rows, columns, directions)
@@ -1,22 +1,44 @@
 import logging
-from datetime import datetime
-from dateutil.parser import parse
-from dateutil.parser import ParserError
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import re
 
 import gspread as gs
 from google.oauth2.service_account import Credentials
 from google.auth.exceptions import GoogleAuthError
-
-from library_system.models.worksheets_cfg import WorksheetSets, WorksheetSet
+from google.auth.transport.requests import AuthorizedSession, Request
+
+from library_system.config import (
+    SQLITE_PATH, CACHE_TTL, WRITE_BATCH_SIZE, WRITE_BATCH_DELAY, COMPACT_TOMBSTONES, TOKEN_REFRESH_MARGIN,
+    SHEETS_READ_QUOTA, SHEETS_WRITE_QUOTA, SHEETS_BURST, REQUEST_RETRIES, REQUEST_BACKOFF_MAX
+)
+from library_system.models.worksheets_cfg import WorksheetSets, WorksheetSet, ROW_ID, worksheet_headers
+from library_system.models.storage import (
+    StorageKinds, StorageBackend, GSheetStorage, MemoryStorage, SQLiteStorage, WriteOp, trim_row,
+    column_map, is_blank
+)
+from library_system.models.cache import SnapshotCache, WorksheetSnapshot
+from library_system.models.scheduler import RequestScheduler, Priority
+from library_system.models.metrics import measured
+from library_system.models.indexes import is_literal
+from library_system.models.write_buffer import WriteBuffer
 from library_system.models.book import Book, BookFields, BorrowFields
+from library_system.models.sorting import sort_key, sort_rows, sort_values
+from library_system.models.records import StockRecord, LoanRecord, record_type
 
 logger = logging.getLogger(__name__)
 
+# fields searched by substring, the other fields are searched by the exact value
+SUBSTRING_FIELDS = (
+    BookFields.title.name, BookFields.author.name, BookFields.genre.name, BorrowFields.borrower_name.name
+)
+
 
 class Library:
     '''
-    Library class that connects to a Google Sheet and provides methods to interact with it.
+    Library class that connects to the worksheets storage and provides methods to interact with it.
+    Worksheets are accessed through the `WorksheetBackend` chosen by the `backend` of each `WorksheetSet`.
 
     Class attributes:
     :param `SCOPE`: Google API scope.
@@ -24,9 +46,21 @@ class Library:
     Instance attributes:
     :param `sheet_name`: Name of the Google Sheet.
     :param `creds_path`: Path to credentials file.
+    :param `cache_ttl`: Number of seconds the worksheets snapshots are cached, `0` disables the cache.
 
-    :param `_SHEET`: `Spreadsheet` instance.
+    :param `s_sheet`: `Spreadsheet` instance.
     :param `isConnected`: indicates if the Library is connected to the Google Sheet.
+    :param `_credentials`: service account `Credentials`, loaded once and refreshed in place.
+    :param `_client`: gspread `Client` kept for the whole session, its HTTP session keeps the connections alive.
+    :param `_auth_request`: transport of the token refresh requests, with its own HTTP session kept alive.
+    :param `_storages`: opened `StorageBackend` instances by `StorageKinds`.
+    :param `scheduler`: `RequestScheduler` of the Google Sheets requests.
+    :param `_cache`: `SnapshotCache` of the worksheets values.
+    :param `search_api_calls`: number of API calls made by the last `search_books` call.
+    :param `_writes`: `WriteBuffer` of the writes waiting to be flushed.
+    :param `_operation_depth`: nesting level of the `operation` blocks.
+    :param `_atomic_depth`: nesting level of the atomic `operation` blocks.
+    :param `_tombstones`: number of the rows cleared by `remove_book` since the last `compact` by worksheet title.
     '''
 
     SCOPE = [
@@ -35,12 +69,25 @@ class Library:
         "https://www.googleapis.com/auth/drive",
     ]
 
-    def __init__(self, sheet_name: str, creds_path: str) -> None:
+    def __init__(self, sheet_name: str, creds_path: str, cache_ttl: float = CACHE_TTL) -> None:
         self._sheet_name = sheet_name
         self._creds_path = creds_path
 
         self.s_sheet: gs.Spreadsheet | None = None
         self.isConnected: bool = False
+        self._credentials: Credentials | None = None
+        self._client: gs.Client | None = None
+        self._auth_request: Request | None = None
+        self._storages: dict[StorageKinds, StorageBackend] = {}
+        self.scheduler = RequestScheduler(
+            SHEETS_READ_QUOTA, SHEETS_WRITE_QUOTA, SHEETS_BURST, REQUEST_RETRIES, REQUEST_BACKOFF_MAX
+        )
+        self._cache = SnapshotCache(cache_ttl)
+        self.search_api_calls: int = 0
+        self._writes = WriteBuffer(WRITE_BATCH_SIZE, WRITE_BATCH_DELAY)
+        self._operation_depth = 0
+        self._atomic_depth = 0
+        self._tombstones: dict[str, int] = {}
 
     def connect(self) -> None:
         '''
@@ -48,67 +95,431 @@ class Library:
         using the credentials in the file at `creds_path`.
         - Create `s_sheet` attr as a `Spreadsheet` instance of the Google Sheet
         - Set `isConnected` attr to `True` if the connection is successful
+
+        The credentials and the client are created only once,
+        the next calls reuse them and only open the spreadsheet if it's not opened yet.
         '''
         try:
-            scope = Credentials.from_service_account_file(
-                self._creds_path, scopes=self.SCOPE)
-            client = gs.authorize(scope)
-            self.s_sheet = client.open(self._sheet_name)
+            if self._credentials is None:
+                self._credentials = Credentials.from_service_account_file(
+                    self._creds_path, scopes=self.SCOPE)
+            if self._client is None:
+                self._client = gs.authorize(self._credentials)
+            if self.s_sheet is None:
+                self.s_sheet = self._client.open(self._sheet_name)
             self.isConnected = True
         except FileNotFoundError:
-            logger.error(f'Credentials file not found at {self._creds_path}.')
+            logger.error('Credentials file not found at %s.', self._creds_path)
         except GoogleAuthError:
             logger.error(
                 'GoogleAuthError: Check your credentials or try again later.')
         except gs.exceptions.SpreadsheetNotFound:
-            logger.error(f'Spreadsheet {self._sheet_name} not found!')
+            logger.error('Spreadsheet %s not found!', self._sheet_name)
         except gs.exceptions.GSpreadException as e:
             logger.error(e)
         except Exception as e:
             # catch-all Exception block is still included to handle any unexpected errors that may occur
-            logger.error(f"An unexpected error occurred: {type(e)}: {e}")
+            logger.error('An unexpected error occurred: %s: %s', type(e), e)
+
+    def refresh_token(self, force: bool = False) -> None:
+        '''
+        Refresh the access token of the credentials in place
+        if it's missing or expires in less than `TOKEN_REFRESH_MARGIN` seconds,
+        so the next request doesn't have to wait for the refresh.
+
+        :param force: refresh the token even if it's still valid
+        '''
+        credentials = self._credentials
+        if credentials is None or self._client is None:
+            return
+        if not force and credentials.token and credentials.expiry is not None \
+                and credentials.expiry - datetime.utcnow() > timedelta(seconds=TOKEN_REFRESH_MARGIN):
+            return
+        if self._auth_request is None:
+            # not the authorized session of the client: it would send the expired token with the refresh request
+            self._auth_request = Request()
+        credentials.refresh(self._auth_request)
+        logger.info('Access token refreshed, expires at %s', credentials.expiry)
+
+    def keep_alive(self) -> None:
+        '''
+        Keep the Google Sheets connection ready between the operations: refresh the token ahead of its expiry.
+        Errors are logged, the next request retries the refresh anyway.
+        '''
+        if not self.isConnected:
+            return
+        try:
+            self.refresh_token()
+        except Exception as e:
+            logger.warning('Failed to refresh the access token: %s: %s', type(e), e)
+
+    def reconnect(self) -> bool:
+        '''
+        Recover the connection after a failed request without creating a new `Library`:
+        - replace the HTTP sessions of the client and of the token refresh,
+          so the broken keep-alive connections are not reused, and refresh the token;
+        - `connect` if the spreadsheet is not opened yet.
+
+        The opened worksheets, storages, column maps and cached snapshots are kept,
+        the gspread objects use the new session through the same client.
+        The writes of a failed operation are already dropped by `operation` or `flush`.
+
+        :return: `True` if the Library is connected or doesn't use Google Sheets
+        '''
+        if self._client is None:
+            # Google Sheets are not used
+            return True
+        if self.s_sheet is None:
+            self.connect()
+            return self.isConnected
+        try:
+            self._client.session.close()
+            self._client.session = AuthorizedSession(self._credentials)
+            if self._auth_request is not None:
+                self._auth_request.session.close()
+                self._auth_request = None
+            self.refresh_token(force=True)
+        except Exception as e:
+            logger.error('Failed to reconnect to the Library Spreadsheet: %s: %s', type(e), e)
+            self.isConnected = False
+        else:
+            self.isConnected = True
+            logger.info('Reconnected to the Library Spreadsheet.')
+        return self.isConnected
+
+    @staticmethod
+    def uses_google_sheets(w_sets: list[WorksheetSets]) -> bool:
+        '''
+        Check if any of the worksheets is stored in the Google Sheet,
+        i.e. the Library has to `connect` before `set_worksheets`.
+        '''
+        return any(w_set.value['backend'] == StorageKinds.gsheet for w_set in w_sets)
+
+    def get_storage(self, kind: StorageKinds) -> StorageBackend:
+        '''
+        Get the `StorageBackend` of the given kind, open it on the first use.
 
+        :param kind: `StorageKinds` enum
+        :return: `StorageBackend` instance
+        '''
+        storage = self._storages.get(kind)
+        if storage is not None:
+            return storage
+
+        if kind == StorageKinds.gsheet:
+            if self.s_sheet is None:
+                raise gs.exceptions.GSpreadException(
+                    'Spreadsheet is not connected.')
+            storage = GSheetStorage(self.s_sheet, self.scheduler)
+        elif kind == StorageKinds.sqlite:
+            storage = SQLiteStorage(SQLITE_PATH)
+        else:
+            storage = MemoryStorage()
+        self._storages[kind] = storage
+        return storage
+
+    @measured
     def set_worksheets(self, w_sets: list[WorksheetSets]) -> None:
         '''
         Sets worksheets for the `Library` instance.
-        Add new worksheets to the `Google Spreadsheet`
+        Add new worksheets to the storage of each `WorksheetSet`
         if they don't exist based on `WorksheetSet` parameters of `w_sets` list.
 
-        Creates `gspread.Worksheet` instances for each `Google Worksheet`
+        Creates `WorksheetBackend` instances for each worksheet
         and adds them to the apropriated `WorksheetSet` dicts as `w_sheet` parameter.
 
+        The worksheets of each storage are listed with a single metadata request,
+        the header rows are read with a single batched request
+        and rewritten only if they differ from the `WorksheetSet` fields followed by the `ROW_ID` column.
+
         :param w_sets: list of `WorksheetSets` enums containing the `WorksheetSet` dicts
         '''
-        if self.s_sheet is None:
-            raise gs.exceptions.GSpreadException(
-                'Spreadsheet is not connected.')
+        # group the worksheets sets by storage
+        storage_sets: dict[StorageKinds, list[WorksheetSet]] = {}
+        for w_set in w_sets:
+            storage_sets.setdefault(w_set.value['backend'], []).append(w_set.value)
+
+        for kind, sets in storage_sets.items():
+            storage = self.get_storage(kind)
+            # get the list of worksheets titles from the storage
+            storage_titles = storage.worksheet_titles()
+
+            for w_set_value in sets:
+                title = w_set_value['title']
+                # set `WorksheetBackend` instance to `WorksheetSet` dict to `w_sheet` parameter
+                w_set_value['w_sheet'] = storage.open_worksheet(
+                    title, worksheet_headers(w_set_value), exists=title in storage_titles
+                )
+
+            # update the first rows with the headers if they differ
+            header_rows = storage.header_rows([w_set_value['title'] for w_set_value in sets])
+            outdated = {
+                w_set_value['title']: worksheet_headers(w_set_value) for w_set_value in sets
+                if header_rows.get(w_set_value['title'], [])[:len(w_set_value['fields']) + 1]
+                != worksheet_headers(w_set_value)
+            }
+            if outdated:
+                storage.update_header_rows(outdated)
+
+            for w_set_value in sets:
+                # keep the column numbers of the headers to avoid looking them up in the worksheet
+                w_set_value['columns'] = column_map(worksheet_headers(w_set_value))
+
+    def get_col(self, w_set: WorksheetSet, field: str, headers: list[str] | None = None) -> int:
+        '''
+        Get the column number of the header `field` from the `columns` map of the worksheet.
+        The map is revalidated if it doesn't contain the field
+        or if it doesn't match the given `headers` row of the worksheet.
+
+        :param w_set: The `WorksheetSet` to get the column number from.
+        :param field: The header name (case insensitive).
+        :param headers: The current header row of the worksheet, e.g. from the snapshot.
+        :return: The column number of the header.
+        '''
+        columns = w_set['columns']
+        col_num = columns.get(field.casefold())
+        if headers is not None:
+            if col_num is None or col_num > len(headers) or headers[col_num - 1].casefold() != field.casefold():
+                logger.warning('Header mismatch in the worksheet <%s>, revalidating columns', w_set['title'])
+                columns = w_set['columns'] = column_map(headers)
+        elif col_num is None and w_set['w_sheet']:
+            columns = w_set['columns'] = column_map(w_set['w_sheet'].row_values(1))
+
+        col_num = columns.get(field.casefold())
+        if col_num is None:
+            raise ValueError(
+                f"Can't to find the header <{field}> in the worksheet <{w_set['title']}>"
+            )
+        return col_num
 
-        # get the list of worksheets titles from the google spreadsheet
-        google_sheet_titles = list(
-            map(lambda sheet: sheet.title, self.s_sheet.worksheets()))
+    @contextmanager
+    def operation(self, atomic: bool = False):
+        '''
+        Context manager grouping the writes made inside the block into batch requests.
+        The writes are flushed when the outermost block exits (or earlier, if the `WriteBuffer` is due).
+        If the block fails, the writes that are not flushed yet are dropped.
 
-        for w_set in w_sets:
-            title = w_set.value['title']
-            headers = w_set.value['fields']
+        :param atomic: If `True` the writes are never flushed before the block exits,
+        so all of them are sent in one batch request per storage which is applied fully or not at all.
+        '''
+        self._operation_depth += 1
+        if atomic:
+            self._atomic_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._operation_depth -= 1
+            self._atomic_depth -= atomic
+            if not self._operation_depth:
+                self._discard_writes()
+            raise
+        self._operation_depth -= 1
+        self._atomic_depth -= atomic
+        if not self._operation_depth:
+            self.flush()
+            self._compact_due()
+
+    def flush(self) -> None:
+        '''
+        Send the buffered writes to the storages.
+        If a batch request fails, the remaining writes are dropped.
+        '''
+        if not len(self._writes):
+            return
+        try:
+            flushed = self._writes.flush(self._storages)
+        except Exception:
+            self._discard_writes()
+            raise
+        logger.info('Flushed %s buffered writes', flushed)
+
+    def _discard_writes(self) -> None:
+        '''
+        Drop the buffered writes and the cached snapshots they were applied to.
+        '''
+        if len(self._writes):
+            logger.warning('Dropping %s buffered writes', len(self._writes))
+        self._writes.clear()
+        self._cache.invalidate()
+
+    def _write(self, w_set: WorksheetSet, method: str, *args) -> None:
+        '''
+        Buffer the write to the worksheet and apply it to the cached snapshot.
+
+        :param w_set: The `WorksheetSet` to write to.
+        :param method: `WorksheetBackend` write method: `update_cell`, `append_row`, `clear_row` or `delete_row`
+        :param args: arguments of the method
+        '''
+        w_sheet = w_set['w_sheet']
+        if not w_sheet:
+            raise ValueError(
+                f"Can't to find the worksheet <{w_set['title']}>"
+            )
+        self._writes.add(w_set['backend'], WriteOp(w_sheet, method, args))
+        getattr(self._cache, method)(w_set['title'], *args)
+        if not self._atomic_depth and self._writes.is_due():
+            self.flush()
+
+    def locate_row(self, w_set: WorksheetSet, book: dict, snapshot: WorksheetSnapshot | None = None) -> None:
+        '''
+        Update the `cell_row` of the book if its row has been moved since the book was read, e.g. by `compact`.
+        The row is found by the book `ROW_ID` in the worksheet snapshot (the `ROW_ID` column index
+        and the `RowMap` of the snapshot), so no request is made while the snapshot is cached.
+        Books without the `ROW_ID` (read before it was added) keep their `cell_row`.
+
+        :param w_set: The `WorksheetSet` of the book.
+        :param book: A dictionary containing the book details, its `cell_row` and `ROW_ID`.
+        :param snapshot: The worksheet snapshot, the cached one by default.
+        '''
+        row_id = book.get(ROW_ID)
+        if not row_id:
+            return
+        if snapshot is None:
+            snapshot = self.get_snapshot(w_set)
+        id_col = self.get_col(w_set, ROW_ID, snapshot.headers)
+        cell_row = book.get('cell_row')
+        if not (cell_row and 1 < cell_row <= len(snapshot.values) and snapshot.cell(cell_row, id_col) == row_id):
+            book['cell_row'] = self._find_row_id(w_set, snapshot, row_id)
+
+    def _find_row_id(self, w_set: WorksheetSet, snapshot: WorksheetSnapshot, row_id: str) -> int:
+        '''
+        Find the row number of the `ROW_ID` in the snapshot.
+
+        :raise ValueError: if the row is not in the snapshot, e.g. the book has been removed
+        '''
+        rows = snapshot.search_value(self.get_col(w_set, ROW_ID, snapshot.headers), row_id)
+        if not rows:
+            raise ValueError(
+                f"Can't to find the row <{row_id}> in the worksheet <{w_set['title']}>. Search the book again."
+            )
+        return rows[0]
+
+    @measured
+    def compact(self, w_set: WorksheetSet) -> int:
+        '''
+        Delete the empty rows left by the removed books and give an id to the rows without `ROW_ID`.
+        The worksheet is read again (unless there are buffered writes) and all the writes are sent in one batch request.
+        The rows below the deleted ones are shifted up,
+        the books read before are found again by their `ROW_ID` (see `locate_row`).
+
+        :param w_set: The `WorksheetSet` to compact.
+        :return: The number of the deleted rows.
+        '''
+        # the rows of another session may have been added or moved since the snapshot was read,
+        # the snapshot is kept if it holds the buffered writes of the running operation
+        if not len(self._writes):
+            self._cache.invalidate(w_set['title'])
+        snapshot = self.get_snapshot(w_set)
+        id_col = self.get_col(w_set, ROW_ID, snapshot.headers)
+        empty_rows = []
+        no_id_rows = []
+        for row in range(2, len(snapshot.values) + 1):
+            if is_blank(snapshot.values[row - 1]):
+                empty_rows.append(row)
+            elif not snapshot.cell(row, id_col):
+                no_id_rows.append(row)
+
+        with self.operation(atomic=True):
+            for row in no_id_rows:
+                self._write(w_set, 'update_cell', row, id_col, new_row_id())
+            # delete from the bottom, so the numbers of the rows to delete are not shifted
+            for row in reversed(empty_rows):
+                self._write(w_set, 'delete_row', row)
+            self._tombstones[w_set['title']] = 0
+        logger.info(
+            'Compacted the worksheet <%s>: deleted %s empty rows, added %s row ids',
+            w_set['title'], len(empty_rows), len(no_id_rows)
+        )
+        return len(empty_rows)
+
+    def _compact_due(self) -> None:
+        '''
+        Compact the worksheets with `COMPACT_TOMBSTONES` or more rows removed since the last compaction.
+        The requests are sent with the background priority.
+        '''
+        for w_set in WorksheetSets:
+            if self._tombstones.get(w_set.value['title'], 0) >= COMPACT_TOMBSTONES and w_set.value['w_sheet']:
+                try:
+                    with self.scheduler.priority(Priority.background):
+                        self.compact(w_set.value)
+                except Exception as e:
+                    # the empty rows are only skipped by the reads, try again after the next removal
+                    logger.warning('Failed to compact the worksheet <%s>: %s: %s', w_set.value['title'], type(e), e)
 
-            if title not in google_sheet_titles:
-                worksheet = self.s_sheet.add_worksheet(
-                    title, rows=100, cols=len(headers)
+    def check_row(self, w_set: WorksheetSet, book: dict, fields: list[str]) -> None:
+        '''
+        Check that the `cell_row` row of the worksheet snapshot still holds the book,
+        so the writes don't hit a row that was changed, shifted or already removed
+        since the book was read, e.g. when a failed operation is retried.
+        The `cell_row` is located by the book `ROW_ID` first, see `locate_row`.
+
+        :param w_set: The `WorksheetSet` of the book.
+        :param book: A dictionary containing the book details and its `cell_row`.
+        :param fields: The fields that must match.
+        '''
+        snapshot = self.get_snapshot(w_set)
+        self.locate_row(w_set, book, snapshot)
+        cell_row = book.get('cell_row')
+        if not cell_row or not 1 < cell_row <= len(snapshot.values):
+            raise ValueError(
+                f"Can't to find the cell row <{cell_row}> in the worksheet <{w_set['title']}>"
+            )
+        row = dict(zip(snapshot.headers, snapshot.values[cell_row - 1]))
+        for field in fields:
+            if str(row.get(field, '')) != str(book.get(field, '')):
+                raise ValueError(
+                    f"The row <{cell_row}> in the worksheet <{w_set['title']}> has been changed. "
+                    f"Search the book again."
                 )
-            else:
-                worksheet = self.s_sheet.worksheet(title)
 
-            # update the first row with the headers
-            worksheet.update('A1', [headers])
-            # set gspread Google worksheet instance to `WorksheetSet` dict to `w_sheet` parameter
-            w_set.value['w_sheet'] = worksheet
+    def get_snapshot(self, w_set: WorksheetSet) -> WorksheetSnapshot:
+        '''
+        Get the cached snapshot of the worksheet values
+        or download all the worksheet values if the snapshot is expired.
+
+        :param w_set: The `WorksheetSet` to get the snapshot of.
+        :return: `WorksheetSnapshot` instance
+        '''
+        snapshot = self._cache.get(w_set['title'])
+        if snapshot is None:
+            snapshot = self._cache.put(w_set['title'], self.read_values(w_set))
+        return snapshot
+
+    def read_values(self, w_set: WorksheetSet) -> list[list[str]]:
+        '''
+        Download all the worksheet values, bypassing the cache.
+
+        :param w_set: The `WorksheetSet` to read.
+        :return: list of the worksheet rows including the header
+        '''
+        w_sheet = w_set['w_sheet']
+        if not w_sheet:
+            raise ValueError(
+                f"Can't to find the worksheet <{w_set['title']}>"
+            )
+        return w_sheet.get_all_values()
+
+    def invalidate_snapshots(self, w_set: WorksheetSet | None = None) -> None:
+        '''
+        Drop the cached snapshot of the worksheet or of all worksheets if `w_set` is None,
+        the next read downloads the values again.
+        '''
+        self._cache.invalidate(None if w_set is None else w_set['title'])
 
-    def search_books(self, book_value: str, book_field: BookFields | BorrowFields, w_set: WorksheetSet) -> list[dict]:
+    @measured
+    def search_books(
+            self, book_value: str | int, book_field: BookFields | BorrowFields, w_set: WorksheetSet
+    ) -> list[dict]:
         '''
         Search a book value with the specified worksheet header - `book_field` and
         in the specified worksheet - `w_set`.
+        The search is made in the worksheet snapshot, so it takes at most one API call
+        to download the worksheet values, regardless of the number of matched rows.
+        Searches of the cached snapshot are answered by its indexes:
+        the trigram index for the substring fields and the hash index for the exact match fields.
+        The number of API calls made is stored in the `search_api_calls` attribute.
 
-        :param `book_value`: validated book value search for.
+        :param `book_value`: validated book value search for, e.g. the year as int.
         :param `book_field`: The worksheet header to search by.
         :param `w_set`: The worksheet to search in.
 
@@ -127,43 +538,51 @@ class Library:
             raise ValueError(
                 f"Can't to find the worksheet <{w_set['title']}>"
             )
+        api_calls = worksheet.api_calls
+        # the worksheet values are strings, the validated year or copies may be int
+        book_value = str(book_value)
 
-        # get the column number of the header
-        header: gs.Cell | None = worksheet.find(
-            field, in_row=1, case_sensitive=False
-        )
-        if header is None:
-            raise ValueError(
-                f"Can't to find the header <{field}> in the worksheet <{w_set['title']}>"
-            )
-        col_num = header.col
+        # get the worksheet values and the column number of the header
+        snapshot = self.get_snapshot(w_set)
+        col_num = self.get_col(w_set, field, snapshot.headers)
 
         # find all cells with the specified value in the column of the header
-        if book_field.name in (
-                BookFields.title.name, BookFields.author.name, BookFields.genre.name, BorrowFields.borrower_name.name):
+        rows = None
+        if book_field.name in SUBSTRING_FIELDS:
             # match the value substring
             regex = re.compile(rf'.*{book_value}.*', re.IGNORECASE)
+            if self._cache.ttl > 0 and is_literal(book_value):
+                # look up the rows in the trigram index of the cached snapshot
+                rows = snapshot.search_substring(col_num, book_value)
         else:
             # match the exact value
             regex = re.compile(rf'^{book_value}$', re.IGNORECASE)
-        matched_cells: list[gs.Cell] = worksheet.findall(
-            regex, in_column=col_num, case_sensitive=False
-        )
+            if self._cache.ttl > 0 and is_literal(book_value):
+                # look up the rows in the hash index of the cached snapshot
+                rows = snapshot.search_value(col_num, book_value)
+        if rows is None:
+            # scan the column, skip the header row
+            rows = [
+                row for row in range(2, len(snapshot.values) + 1) if regex.search(snapshot.cell(row, col_num))
+            ]
 
         # create a list of dictionaries containing the book details
         headers = w_set['fields']
+        id_col = w_set['columns'].get(ROW_ID)
         result_list = []
-        for cell in matched_cells:
-            # skip the header row
-            if cell.row == 1:
-                continue
-            value_list = worksheet.row_values(cell.row)
-            value_dict = dict(zip(headers, value_list))
-            value_dict['cell_row'] = cell.row
+        for row in rows:
+            value_dict: dict[str, str | int] = dict(zip(headers, trim_row(snapshot.values[row - 1])))
+            value_dict['cell_row'] = row
+            if id_col and snapshot.cell(row, id_col):
+                value_dict[ROW_ID] = snapshot.cell(row, id_col)
             result_list.append(value_dict)
 
+        self.search_api_calls = worksheet.api_calls - api_calls
+        logger.info(
+            'Search in <%s> found %s rows with %s API calls', w_set['title'], len(result_list), self.search_api_calls)
         return result_list
 
+    @measured
     def add_book_copies(self, book_to_add: dict, w_set: WorksheetSet, copies_to_add: int) -> dict:
         '''
         Add copies to the existing book in the stock worksheet.
@@ -178,6 +597,7 @@ class Library:
             raise ValueError(
                 f"Can't to find the worksheet <{w_set['title']}>"
             )
+        self.locate_row(w_set, book_to_add)
         cell_row = book_to_add.get('cell_row')
         if not cell_row:
             raise ValueError(
@@ -188,20 +608,14 @@ class Library:
             new_num_copies = copies_to_add
         else:
             new_num_copies = int(current_copies) + copies_to_add
-        field = 'copies'
-        header = w_sheet.find(
-            field, in_row=1, case_sensitive=False
-        )
-        if not header:
-            raise ValueError(
-                f"Can't to find the header <{field}> in the worksheet <{w_set['title']}>"
-            )
-        col_num = header.col
+        col_num = self.get_col(w_set, BookFields.copies.name)
 
-        w_sheet.update_cell(cell_row, col_num, new_num_copies)
+        with self.operation():
+            self._write(w_set, 'update_cell', cell_row, col_num, new_num_copies)
         book_to_add[BookFields.copies.name] = new_num_copies
         return book_to_add
 
+    @measured
     def append_book(self, book: Book | dict, w_set: WorksheetSet):
         '''
         Append a book to the worksheet.
@@ -229,10 +643,13 @@ class Library:
             book_to_add = book
         book_to_add.setdefault('copies', 1)  # add copies field if not exists
         # get the values of the book dictionary in the same order as the headers in the worksheet
-        values = [book_to_add.get(field) for field in fields]
-        w_sheet.append_row(values)
+        # and give the row a new id
+        values = [book_to_add.get(field) for field in fields] + [new_row_id()]
+        with self.operation():
+            self._write(w_set, 'append_row', values)
         return book_to_add
 
+    @measured
     def remove_book(
             self, book_to_remove: dict, w_set: WorksheetSet, copies_to_remove: int = 1, totally: bool = False
     ) -> dict | None:
@@ -250,34 +667,33 @@ class Library:
             raise ValueError(
                 f"Can't to find the worksheet <{w_set['title']}>"
             )
+        self.locate_row(w_set, book_to_remove)
         cell_row = book_to_remove['cell_row']
         current_copies = book_to_remove.get(BookFields.copies.name)
-        if totally or not current_copies or not current_copies.isdigit():
-            w_sheet.delete_row(cell_row)
+        if totally or not current_copies or not current_copies.isdigit() \
+                or int(current_copies) - copies_to_remove <= 0:
+            # clear the row instead of deleting it, so the rows below are not shifted,
+            # the empty rows are deleted by `compact`
+            with self.operation():
+                self._write(w_set, 'clear_row', cell_row)
+                self._tombstones[w_set['title']] = self._tombstones.get(w_set['title'], 0) + 1
             return None
 
         new_num_copies = int(current_copies) - copies_to_remove
-        if new_num_copies <= 0:
-            w_sheet.delete_row(cell_row)
-            return None
 
-        field = 'copies'
-        header = w_sheet.find(
-            field, in_row=1, case_sensitive=False
-        )
-        if not header:
-            raise ValueError(
-                f"Can't to find the header <{field}> in the worksheet <{w_set['title']}>"
-            )
-        col_num = header.col
+        col_num = self.get_col(w_set, BookFields.copies.name)
 
-        w_sheet.update_cell(cell_row, col_num, new_num_copies)
+        with self.operation():
+            self._write(w_set, 'update_cell', cell_row, col_num, new_num_copies)
         book_to_remove[BookFields.copies.name] = new_num_copies
         return book_to_remove
 
+    @measured
     def check_out_book(self, book_to_check_out: dict):
         '''
         Check out a book from the library stock.
+        The stock and borrowed worksheets writes are sent in one atomic batch request
+        (when both worksheets use the same storage).
 
         :param book_to_check_out: A dictionary containing the book details.
         :return: A dictionary containing the updated book details.
@@ -285,17 +701,22 @@ class Library:
         stock_set = WorksheetSets.stock.value
         borrowed_set = WorksheetSets.borrowed.value
 
-        # add a book to the borrowed worksheet with the borrower's details
-        self.append_book(book_to_check_out, borrowed_set)
+        with self.operation(atomic=True):
+            self.check_row(stock_set, book_to_check_out, [BookFields.isbn.name])
+            # add a book to the borrowed worksheet with the borrower's details
+            self.append_book(book_to_check_out, borrowed_set)
 
-        # remove a single copy of the book from the library stock
-        upd_book = self.remove_book(book_to_check_out, stock_set)
+            # remove a single copy of the book from the library stock
+            upd_book = self.remove_book(book_to_check_out, stock_set)
 
         return upd_book
 
+    @measured
     def return_book(self, book_to_return: dict) -> dict:
         '''
         Return a book to the library stock and remove it from the borrowed worksheet.
+        The book is looked up in the stock snapshot and the writes to both worksheets
+        are sent in one atomic batch request (when both worksheets use the same storage).
 
         :param book_to_return: A dictionary containing the book details.
         :return: A dictionary containing the updated book details.
@@ -303,91 +724,132 @@ class Library:
         book_field = BookFields.isbn
         book_value = book_to_return.get(book_field.name)
         w_set = WorksheetSets.stock.value
+        borrowed_set = WorksheetSets.borrowed.value
         if not book_value:
             raise ValueError(
                 f"Can't to find the book value {book_field.name} in book_to_return dict"
             )
-        found_books = self.search_books(book_value, book_field, w_set)
-        if len(found_books) > 0:
-            upd_book = self.add_book_copies(found_books[0], w_set, 1)
-        else:
-            upd_book = self.append_book(book_to_return, w_set)
+        with self.operation(atomic=True):
+            self.check_row(borrowed_set, book_to_return, [
+                BorrowFields.isbn.name, BorrowFields.borrower_name.name, BorrowFields.due_date.name
+            ])
+            found_books = self.search_books(book_value, book_field, w_set)
+            if len(found_books) > 0:
+                upd_book = self.add_book_copies(found_books[0], w_set, 1)
+            else:
+                upd_book = self.append_book(book_to_return, w_set)
 
-        # remove the book from the borrowed worksheet
-        self.remove_book(
-            book_to_return, WorksheetSets.borrowed.value, totally=True)
+            # remove the book from the borrowed worksheet
+            self.remove_book(book_to_return, borrowed_set, totally=True)
 
         return upd_book
 
-    def get_overdue_borrowers(self) -> list[dict]:
+    def get_loans_by_due_date(self, start: datetime | None = None, end: datetime | None = None) -> list[LoanRecord]:
         '''
-        Get a list of overdue borrowers.
+        Get the borrowed books with the due date in the range `start <= due date < end`.
+        The books are found in the due date index of the `borrowed` worksheet snapshot,
+        books with an invalid due date are skipped.
 
-        :return: A list of dictionaries containing the overdue borrowers details.
+        :param start: start of the range, None for no lower bound
+        :param end: end of the range (excluded), None for no upper bound
+        :return: A list of `LoanRecord` of the borrowed books, sorted by due date (ascending).
         '''
         w_set = WorksheetSets.borrowed.value
-        w_sheet = w_set['w_sheet']
-        if not w_sheet:
-            raise ValueError(
-                f"Can't to find the worksheet <{w_set['title']}>"
-            )
+        snapshot = self.get_snapshot(w_set)
+        col_num = self.get_col(w_set, BorrowFields.due_date.name, snapshot.headers)
+        rows = snapshot.search_dates(col_num, start, end)
+        return self.get_records(w_set, rows, snapshot)  # type: ignore[return-value]
 
-        overdue_borrowers = w_sheet.get_all_records(head=1)
-        # add the cell row number to each book dictionary
-        overdue_borrowers_with_cell_row = [
-            {**book, 'cell_row': i + 2} for i, book in enumerate(overdue_borrowers)
-        ]
+    @measured
+    def get_overdue_borrowers(self, days: int = 0) -> list[LoanRecord]:
+        '''
+        Get a list of overdue borrowers.
 
-        # filter out the books that are overdue
+        :param days: get only the borrowers overdue by more than the number of days
+        :return: A list of `LoanRecord` of the overdue borrowers, sorted by due date (ascending).
+        '''
+        return self.get_loans_by_due_date(end=datetime.today() - timedelta(days=days))
+
+    @measured
+    def get_due_borrowers(self, days: int) -> list[LoanRecord]:
+        '''
+        Get a list of borrowers whose books are due in the next number of days.
+
+        :param days: number of days
+        :return: A list of `LoanRecord` of the borrowers, sorted by due date (ascending).
+        '''
         today = datetime.today()
-        overdue_borrowers = []
-        for book in overdue_borrowers_with_cell_row:
-            due_date = book.get(BorrowFields.due_date.name)
-            if due_date and isinstance(due_date, str):
-                try:
-                    # convert the due date string to a date object
-                    due_date = parse(due_date, dayfirst=True)
-                except (ParserError, ValueError, OverflowError):
-                    continue
-                else:
-                    if due_date < today:
-                        overdue_borrowers.append(book)
-        # sort the overdue borrowers by due date (ascending)
-        sorted_borrowers = sort_data(
-            BorrowFields.due_date.name, overdue_borrowers)
-        return sorted_borrowers
+        return self.get_loans_by_due_date(today, today + timedelta(days=days))
 
+    @measured
     def get_library_stock(
             self,
             w_set: WorksheetSet,
-            field: BookFields | BorrowFields | None = None,
-            reverse: bool = False
-    ) -> list[dict]:
+            field: BookFields | BorrowFields | list[BookFields | BorrowFields] | None = None,
+            reverse: bool | list[bool] = False,
+            limit: int | None = None
+    ) -> list[StockRecord] | list[LoanRecord]:
         '''
         Get the library stock.
-        If a field is provided then the stock will be sorted by that field.
+        If a field or a list of fields is provided then the stock will be sorted by them,
+        e.g. by genre, then by author, then by year. Rows with equal values keep the worksheet order.
+        Sorted row orders are cached with the worksheet snapshot until it changes.
 
         :param w_set: The worksheet set to get the stock from.
-        :param field: The field to sort the stock by.
-        :param reverse: If `True` the stock will be sorted in descending order.
-        :return: A list of dictionaries containing the library stock.
+        :param field: The field or the list of fields to sort the stock by.
+        :param reverse: If `True` the stock will be sorted in descending order, can be given for each field.
+        :param limit: Return only the first number of rows.
+        :return: A list of `StockRecord` or `LoanRecord` of the worksheet rows.
         '''
-        w_sheet = w_set['w_sheet']
-        if not w_sheet:
-            raise ValueError(
-                f"Can't to find the worksheet <{w_set['title']}>"
-            )
-        dicts = w_sheet.get_all_records(head=1)
-        # add the cell row number to each book record
-        records = [
-            {**book, 'cell_row': i + 2} for i, book in enumerate(dicts)
-        ]
-        order_by = field.name if field else None
-        if not order_by:
-            return records
-        # sort the records by the field
-        sorted_records = sort_data(order_by, records, reverse)
-        return sorted_records
+        snapshot = self.get_snapshot(w_set)
+        headers = snapshot.headers
+        fields = [] if field is None else field if isinstance(field, list) else [field]
+        # skip the empty rows of the removed books
+        live_rows = [row for row in range(2, len(snapshot.values) + 1) if not is_blank(snapshot.values[row - 1])]
+        if not fields:
+            rows = live_rows[:limit]
+        else:
+            directions = reverse if isinstance(reverse, list) else [reverse] * len(fields)
+            sort_keys = tuple((f.name, bool(r)) for f, r in zip(fields, directions))
+            cached_rows = snapshot.permutations.get(sort_keys)
+            if cached_rows is not None:
+                rows = cached_rows[:limit]
+            else:
+                cols = [self.get_col(w_set, name, headers) for name, _ in sort_keys]
+                if limit is not None and limit < len(live_rows):
+                    # select the first rows without sorting all of them
+                    rows = sort_values(snapshot.values, live_rows, cols, sort_keys, limit)
+                else:
+                    rows = sort_values(snapshot.values, live_rows, cols, sort_keys)
+                    if self._cache.ttl > 0:
+                        snapshot.permutations[sort_keys] = rows
+                    rows = rows[:limit]
+        return self.get_records(w_set, rows, snapshot)
+
+    def get_records(
+            self, w_set: WorksheetSet, rows: list[int], snapshot: WorksheetSnapshot | None = None
+    ) -> list[StockRecord] | list[LoanRecord]:
+        '''
+        Build the records of the worksheet snapshot rows.
+
+        :param w_set: The `WorksheetSet` of the rows.
+        :param rows: The row numbers.
+        :param snapshot: The snapshot the row numbers refer to, the current snapshot by default.
+        :return: A list of `StockRecord` for the stock worksheet or `LoanRecord` for the borrowed worksheet.
+        '''
+        if snapshot is None:
+            snapshot = self.get_snapshot(w_set)
+        record_cls = record_type(w_set)
+        cols = [self.get_col(w_set, field, snapshot.headers) for field in record_cls.FIELDS]
+        values = snapshot.values
+        return [record_cls.from_row(values[row - 1], cols, row) for row in rows]  # type: ignore[misc]
+
+
+def new_row_id() -> str:
+    '''
+    Generate a unique id of a worksheet row.
+    '''
+    return uuid.uuid4().hex[:16]
 
 
 def sort_data(key: str, records: list[dict], reverse: bool = False) -> list[dict]:
@@ -403,35 +865,9 @@ def sort_data(key: str, records: list[dict], reverse: bool = False) -> list[dict
     :param reverse: sort in reverse order
     :return: sorted list of dictionaries
     '''
-    if key in (BorrowFields.borrow_date.name, BorrowFields.due_date.name):
-        def sort_date(d):
-            try:
-                return parse(d[key], dayfirst=True)
-            except (ParserError, ValueError, OverflowError):
-                if reverse:
-                    return datetime.min
-                else:
-                    return datetime.max
-        # sort by date if date valid else put it at the end of the list with the same date string
-        sorted_records = sorted(records, key=sort_date, reverse=reverse)
-    else:
-        if key in (BookFields.isbn.name, BookFields.copies.name, BookFields.year.name):
-            def sort_int(d):
-                '''sort by int value'''
-                try:
-                    return int(d[key])
-                except ValueError:
-                    if reverse:
-                        return float('-inf')  # smallest float
-                    else:
-                        return float('inf')  # largest float
-            sorted_records = sorted(records, key=sort_int, reverse=reverse)
-        else:
-            # sort by string value
-            sorted_records = sorted(
-                records, key=lambda d: str(d[key]), reverse=reverse)
-
-    return sorted_records
+    value_key = sort_key(key, reverse)
+    keys = [value_key(record[key]) for record in records]
+    return [records[i] for i in sort_rows(list(range(len(records))), [keys], [reverse])]
 
 
 # for testing purposes
@@ -0,0 +1,641 @@
+'''
+Storage backends for the `Library` worksheets.
+
+Every worksheet used by the `Library` is accessed through the `WorksheetBackend` protocol,
+so the same `Library` methods can work with a Google Sheet, an in-memory table or a local SQLite database.
+Rows and columns are numbered from 1 as in a spreadsheet and row 1 holds the header.
+'''
+import sqlite3
+from enum import Enum
+from functools import wraps
+from typing import TYPE_CHECKING, NamedTuple, Protocol
+
+from library_system.models.scheduler import RequestScheduler, RequestKinds
+from library_system.models.metrics import metrics, timed_call
+
+if TYPE_CHECKING:
+    # gspread is imported by the Google Sheets methods, the other backends don't load it at startup
+    import gspread as gs
+
+
+class StorageKinds(Enum):
+    '''
+    Available storage backends for the worksheets.
+    '''
+    gsheet = 'gsheet'
+    memory = 'memory'
+    sqlite = 'sqlite'
+
+
+class WorksheetBackend(Protocol):
+    '''
+    Worksheet operations required by the `Library` class.
+    `api_calls` counts the requests made to the storage.
+    '''
+    title: str
+    api_calls: int
+
+    def get_all_values(self) -> list[list[str]]:
+        '''Return all rows of the worksheet including the header row.'''
+        ...
+
+    def row_values(self, row: int) -> list[str]:
+        '''Return the values of the row.'''
+        ...
+
+    def get_rows(self, start: int, end: int) -> list[list[str]]:
+        '''Return the rows from `start` to `end` inclusive, fewer if the worksheet ends before `end`.'''
+        ...
+
+    def row_count(self) -> int:
+        '''Return the number of the rows of the worksheet including the empty ones, the rows below are empty.'''
+        ...
+
+    def update_cell(self, row: int, col: int, value) -> None:
+        '''Set the value of a single cell.'''
+        ...
+
+    def append_row(self, values: list) -> None:
+        '''Append a row after the last non-empty row of the worksheet.'''
+        ...
+
+    def clear_row(self, row: int) -> None:
+        '''Clear all the cells of the row, the rows below it are not shifted.'''
+        ...
+
+    def delete_row(self, row: int) -> None:
+        '''Delete the row and shift the rows below it up.'''
+        ...
+
+
+class WriteOp(NamedTuple):
+    '''
+    Buffered write to a worksheet.
+
+    :param worksheet: `WorksheetBackend` to write to
+    :param method: name of the `WorksheetBackend` write method:
+    `update_cell`, `append_row`, `clear_row` or `delete_row`
+    :param args: arguments of the method
+    '''
+    worksheet: WorksheetBackend
+    method: str
+    args: tuple
+
+
+class StorageBackend(Protocol):
+    '''
+    Container of worksheets, e.g. a Google Spreadsheet or a SQLite database file.
+    `api_calls` counts the requests made to the storage itself.
+    '''
+    api_calls: int
+
+    def worksheet_titles(self) -> list[str]:
+        '''Return the titles of the existing worksheets.'''
+        ...
+
+    def open_worksheet(self, title: str, headers: list[str], exists: bool) -> WorksheetBackend:
+        '''Open the worksheet `title` or create it with the `headers` columns if it doesn't `exists`.'''
+        ...
+
+    def header_rows(self, titles: list[str]) -> dict[str, list[str]]:
+        '''Read the first rows of the worksheets `titles` in one request.'''
+        ...
+
+    def update_header_rows(self, headers: dict[str, list[str]]) -> None:
+        '''Write the headers to the first rows of the worksheets by title in one request.'''
+        ...
+
+    def apply_batch(self, ops: list[WriteOp]) -> None:
+        '''Apply the writes in the given order in one request.'''
+        ...
+
+
+def api_call(method):
+    '''
+    Decorator for the `WorksheetBackend` and `StorageBackend` methods that make a request to the storage,
+    increments the `api_calls` counter of the instance and records the call in the `metrics`.
+    '''
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.api_calls += 1
+        if metrics.enabled:
+            return timed_call(method.__name__, method, self, *args, **kwargs)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def scheduled(kind: RequestKinds):
+    '''
+    Decorator for the Google Sheets methods making a single request:
+    increments the `api_calls` counter, sends the request through the `scheduler` of the instance
+    and records the call in the `metrics`.
+    '''
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self.api_calls += 1
+            if metrics.enabled:
+                return timed_call(method.__name__, self.scheduler.call, kind, method, self, *args, **kwargs)
+            return self.scheduler.call(kind, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cell_str(value) -> str:
+    '''Convert a cell value to string as it would be returned by the Google Sheets API.'''
+    return '' if value is None else str(value)
+
+
+def trim_row(values: list[str]) -> list[str]:
+    '''Remove trailing empty cells as the Google Sheets API does.'''
+    end = len(values)
+    while end and values[end - 1] == '':
+        end -= 1
+    return values[:end]
+
+
+def is_blank(values: list[str]) -> bool:
+    '''Check if all the cells of the row are empty, e.g. a cleared row.'''
+    return not any(values)
+
+
+def cell_data(value) -> dict:
+    '''Build the Google Sheets API `CellData` with the value entered as is.'''
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+def column_map(headers: list[str]) -> dict[str, int]:
+    '''Map the casefolded header names to their column numbers.'''
+    return {header.casefold(): col for col, header in enumerate(headers, start=1) if header}
+
+
+class GSheetWorksheet:
+    '''
+    `WorksheetBackend` for a Google Sheets worksheet.
+
+    :param w_sheet: gspread `Worksheet` instance
+    :param scheduler: `RequestScheduler` of the spreadsheet requests
+    '''
+
+    def __init__(self, w_sheet: 'gs.Worksheet', scheduler: RequestScheduler) -> None:
+        self.w_sheet = w_sheet
+        self.title = w_sheet.title
+        self.scheduler = scheduler
+        self.api_calls = 0
+
+    @scheduled(RequestKinds.read)
+    def get_all_values(self) -> list[list[str]]:
+        return self.w_sheet.get_all_values()
+
+    @scheduled(RequestKinds.read)
+    def row_values(self, row: int) -> list[str]:
+        return self.w_sheet.row_values(row)
+
+    @scheduled(RequestKinds.read)
+    def get_rows(self, start: int, end: int) -> list[list[str]]:
+        return [list(row) for row in self.w_sheet.get(f'{start}:{end}')]
+
+    @scheduled(RequestKinds.read)
+    def row_count(self) -> int:
+        # the `row_count` of the gspread worksheet is read when it's opened, the grid grows with the appended rows
+        metadata = self.w_sheet.spreadsheet.fetch_sheet_metadata({'fields': 'sheets.properties'})
+        for sheet in metadata['sheets']:
+            if sheet['properties']['sheetId'] == self.w_sheet.id:
+                return sheet['properties']['gridProperties']['rowCount']
+        raise ValueError(f"Can't to find the worksheet <{self.title}>")
+
+    @scheduled(RequestKinds.write)
+    def update_cell(self, row: int, col: int, value) -> None:
+        self.w_sheet.update_cell(row, col, value)
+
+    @scheduled(RequestKinds.write)
+    def append_row(self, values: list) -> None:
+        self.w_sheet.append_row(values)
+
+    @scheduled(RequestKinds.write)
+    def clear_row(self, row: int) -> None:
+        self.w_sheet.batch_clear([f'{row}:{row}'])
+
+    @scheduled(RequestKinds.write)
+    def delete_row(self, row: int) -> None:
+        self.w_sheet.delete_row(row)
+
+    def batch_request(self, op: WriteOp) -> dict:
+        '''
+        Build the Google Sheets API `batchUpdate` request of the write.
+        '''
+        sheet_id = self.w_sheet.id
+        if op.method == 'update_cell':
+            row, col, value = op.args
+            return {'updateCells': {
+                'range': {
+                    'sheetId': sheet_id,
+                    'startRowIndex': row - 1, 'endRowIndex': row,
+                    'startColumnIndex': col - 1, 'endColumnIndex': col,
+                },
+                'rows': [{'values': [cell_data(value)]}],
+                'fields': 'userEnteredValue',
+            }}
+        if op.method == 'append_row':
+            values, = op.args
+            return {'appendCells': {
+                'sheetId': sheet_id,
+                'rows': [{'values': [cell_data(value) for value in values]}],
+                'fields': 'userEnteredValue',
+            }}
+        if op.method == 'clear_row':
+            row, = op.args
+            # no `rows` data clears the `fields` of the range
+            return {'updateCells': {
+                'range': {'sheetId': sheet_id, 'startRowIndex': row - 1, 'endRowIndex': row},
+                'fields': 'userEnteredValue',
+            }}
+        if op.method == 'delete_row':
+            row, = op.args
+            return {'deleteDimension': {
+                'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': row - 1, 'endIndex': row}
+            }}
+        raise ValueError(f'Unknown write method <{op.method}>')
+
+
+class GSheetStorage:
+    '''
+    `StorageBackend` for a Google Spreadsheet.
+
+    :param s_sheet: gspread `Spreadsheet` instance
+    :param scheduler: `RequestScheduler` of the spreadsheet requests
+    '''
+
+    def __init__(self, s_sheet: 'gs.Spreadsheet', scheduler: RequestScheduler) -> None:
+        self.s_sheet = s_sheet
+        self.scheduler = scheduler
+        self.api_calls = 0
+        # worksheets fetched by the last `worksheet_titles` call
+        self._worksheets: 'dict[str, gs.Worksheet]' = {}
+
+    def _request(self, kind: RequestKinds, func, *args, **kwargs):
+        '''
+        Send a single request of the spreadsheet method `func` through the `scheduler`, as `scheduled` does.
+        '''
+        self.api_calls += 1
+        if metrics.enabled:
+            return timed_call(func.__name__, self.scheduler.call, kind, func, *args, **kwargs)
+        return self.scheduler.call(kind, func, *args, **kwargs)
+
+    @scheduled(RequestKinds.read)
+    def worksheet_titles(self) -> list[str]:
+        self._worksheets = {sheet.title: sheet for sheet in self.s_sheet.worksheets()}
+        return list(self._worksheets)
+
+    def open_worksheet(self, title: str, headers: list[str], exists: bool) -> GSheetWorksheet:
+        if not exists:
+            worksheet = self._request(
+                RequestKinds.write, self.s_sheet.add_worksheet, title, rows=100, cols=len(headers)
+            )
+        elif title in self._worksheets:
+            # reuse the worksheet metadata fetched by `worksheet_titles`
+            worksheet = self._worksheets[title]
+        else:
+            worksheet = self._request(RequestKinds.read, self.s_sheet.worksheet, title)
+        self._worksheets[title] = worksheet
+        return GSheetWorksheet(worksheet, self.scheduler)
+
+    @scheduled(RequestKinds.read)
+    def header_rows(self, titles: list[str]) -> dict[str, list[str]]:
+        from gspread.utils import absolute_range_name
+
+        ranges = [absolute_range_name(title, '1:1') for title in titles]
+        response = self.s_sheet.values_batch_get(ranges)
+        value_ranges = response.get('valueRanges', [])
+        return {
+            title: (value_range.get('values') or [[]])[0]
+            for title, value_range in zip(titles, value_ranges)
+        }
+
+    def update_header_rows(self, headers: dict[str, list[str]]) -> None:
+        from gspread.utils import absolute_range_name
+
+        # add the columns missing for the headers, the values can't be written out of the grid
+        requests = [
+            {'appendDimension': {
+                'sheetId': self._worksheets[title].id, 'dimension': 'COLUMNS',
+                'length': len(row) - self._worksheets[title].col_count
+            }}
+            for title, row in headers.items() if len(row) > self._worksheets[title].col_count
+        ]
+        if requests:
+            self._request(RequestKinds.write, self.s_sheet.batch_update, {'requests': requests})
+        data = [
+            {'range': absolute_range_name(title, 'A1'), 'values': [row]}
+            for title, row in headers.items()
+        ]
+        self._request(
+            RequestKinds.write, self.s_sheet.values_batch_update, body={'valueInputOption': 'RAW', 'data': data}
+        )
+
+    @scheduled(RequestKinds.write)
+    def apply_batch(self, ops: list[WriteOp]) -> None:
+        # the Sheets API applies the requests of a `batchUpdate` in order and atomically:
+        # if any request fails, none of them is applied
+        requests = [op.worksheet.batch_request(op) for op in ops]  # type: ignore[attr-defined]
+        self.s_sheet.batch_update({'requests': requests})
+
+
+class MemoryWorksheet:
+    '''
+    `WorksheetBackend` keeping the rows in a list. The data is lost when the app exits.
+    '''
+
+    def __init__(self, title: str) -> None:
+        self.title = title
+        self.api_calls = 0
+        self._rows: list[list[str]] = []
+
+    def _values(self) -> list[list[str]]:
+        self._trim_rows()
+        width = max(map(len, self._rows), default=0)
+        return [row + [''] * (width - len(row)) for row in self._rows]
+
+    def _trim_rows(self) -> None:
+        '''Remove the trailing empty rows, the Google Sheets API doesn't return them.'''
+        while self._rows and is_blank(self._rows[-1]):
+            self._rows.pop()
+
+    def _row_values(self, row: int) -> list[str]:
+        if row > len(self._rows):
+            return []
+        return trim_row(list(self._rows[row - 1]))
+
+    def _rows_range(self, start: int, end: int) -> list[list[str]]:
+        return [trim_row(list(row)) for row in self._rows[start - 1:end]]
+
+    def _update_cell(self, row: int, col: int, value) -> None:
+        while len(self._rows) < row:
+            self._rows.append([])
+        values = self._rows[row - 1]
+        if len(values) < col:
+            values.extend([''] * (col - len(values)))
+        values[col - 1] = cell_str(value)
+
+    def _append_row(self, values: list) -> None:
+        self._trim_rows()
+        self._rows.append(trim_row([cell_str(value) for value in values]))
+
+    def _clear_row(self, row: int) -> None:
+        if row <= len(self._rows):
+            self._rows[row - 1] = []
+
+    def _delete_row(self, row: int) -> None:
+        if row <= len(self._rows):
+            del self._rows[row - 1]
+
+    def _update_headers(self, headers: list[str]) -> None:
+        for col, header in enumerate(headers, start=1):
+            self._update_cell(1, col, header)
+
+    @api_call
+    def get_all_values(self) -> list[list[str]]:
+        return self._values()
+
+    @api_call
+    def row_values(self, row: int) -> list[str]:
+        return self._row_values(row)
+
+    @api_call
+    def get_rows(self, start: int, end: int) -> list[list[str]]:
+        return self._rows_range(start, end)
+
+    @api_call
+    def row_count(self) -> int:
+        return len(self._rows)
+
+    @api_call
+    def update_cell(self, row: int, col: int, value) -> None:
+        self._update_cell(row, col, value)
+
+    @api_call
+    def append_row(self, values: list) -> None:
+        self._append_row(values)
+
+    @api_call
+    def clear_row(self, row: int) -> None:
+        self._clear_row(row)
+
+    @api_call
+    def delete_row(self, row: int) -> None:
+        self._delete_row(row)
+
+
+class MemoryStorage:
+    '''
+    `StorageBackend` keeping the worksheets in memory.
+    '''
+
+    def __init__(self) -> None:
+        self.api_calls = 0
+        self._worksheets: dict[str, MemoryWorksheet] = {}
+
+    @api_call
+    def worksheet_titles(self) -> list[str]:
+        return list(self._worksheets)
+
+    def open_worksheet(self, title: str, headers: list[str], exists: bool) -> MemoryWorksheet:
+        return self._worksheets.setdefault(title, MemoryWorksheet(title))
+
+    @api_call
+    def header_rows(self, titles: list[str]) -> dict[str, list[str]]:
+        return {title: self._worksheets[title]._row_values(1) for title in titles}
+
+    @api_call
+    def update_header_rows(self, headers: dict[str, list[str]]) -> None:
+        for title, row in headers.items():
+            self._worksheets[title]._update_headers(row)
+
+    @api_call
+    def apply_batch(self, ops: list[WriteOp]) -> None:
+        # keep a copy of the rows to roll back the batch if any write fails
+        backups = {op.worksheet.title: [list(row) for row in op.worksheet._rows] for op in ops}  # type: ignore
+        try:
+            for op in ops:
+                getattr(op.worksheet, f'_{op.method}')(*op.args)
+        except Exception:
+            for title, rows in backups.items():
+                self._worksheets[title]._rows = rows
+            raise
+
+
+class SQLiteWorksheet:
+    '''
+    `WorksheetBackend` storing the worksheet in a table of a SQLite database.
+    Each table row is a worksheet row (the first one is the header) ordered by the `id` column;
+    cells are stored as text in the `c1`...`cN` columns.
+    The private methods don't commit, the public ones run in their own transaction.
+
+    :param conn: SQLite connection
+    :param title: title of the worksheet and name of the table
+    :param cols: initial number of the cell columns
+    '''
+
+    def __init__(self, conn: sqlite3.Connection, title: str, cols: int) -> None:
+        self.title = title
+        self.api_calls = 0
+        self._conn = conn
+        self._table = '"' + title.replace('"', '""') + '"'
+        cells = ''.join(f', c{col} TEXT' for col in range(1, cols + 1))
+        with conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {self._table} (id INTEGER PRIMARY KEY AUTOINCREMENT{cells})')
+        self._cols = len(conn.execute(f'SELECT * FROM {self._table} LIMIT 0').description) - 1
+
+    def _ensure_cols(self, cols: int) -> None:
+        '''Add cell columns to the table so it has at least `cols` of them.'''
+        while self._cols < cols:
+            self._conn.execute(f'ALTER TABLE {self._table} ADD COLUMN c{self._cols + 1} TEXT')
+            self._cols += 1
+
+    def _row_id(self, row: int) -> int | None:
+        '''Get the `id` of the row number.'''
+        found = self._conn.execute(
+            f'SELECT id FROM {self._table} ORDER BY id LIMIT 1 OFFSET ?', (row - 1,)
+        ).fetchone()
+        return found[0] if found else None
+
+    def _values(self) -> list[list[str]]:
+        rows = self._conn.execute(f'SELECT * FROM {self._table} ORDER BY id').fetchall()
+        values = [[cell_str(value) for value in row[1:]] for row in rows]
+        # skip the trailing empty rows, the Google Sheets API doesn't return them
+        while values and is_blank(values[-1]):
+            values.pop()
+        width = max((len(trim_row(row)) for row in values), default=0)
+        return [row[:width] for row in values]
+
+    def _row_values(self, row: int) -> list[str]:
+        found = self._conn.execute(
+            f'SELECT * FROM {self._table} ORDER BY id LIMIT 1 OFFSET ?', (row - 1,)
+        ).fetchone()
+        return trim_row([cell_str(value) for value in found[1:]]) if found else []
+
+    def _rows_range(self, start: int, end: int) -> list[list[str]]:
+        rows = self._conn.execute(
+            f'SELECT * FROM {self._table} ORDER BY id LIMIT ? OFFSET ?', (end - start + 1, start - 1)
+        ).fetchall()
+        return [trim_row([cell_str(value) for value in row[1:]]) for row in rows]
+
+    def _update_cell(self, row: int, col: int, value) -> None:
+        self._ensure_cols(col)
+        while (row_id := self._row_id(row)) is None:
+            self._conn.execute(f'INSERT INTO {self._table} DEFAULT VALUES')
+        self._conn.execute(f'UPDATE {self._table} SET c{col} = ? WHERE id = ?', (cell_str(value), row_id))
+
+    def _append_row(self, values: list) -> None:
+        # append after the last non-empty row
+        while (last := self._conn.execute(f'SELECT * FROM {self._table} ORDER BY id DESC LIMIT 1').fetchone()) \
+                and is_blank([cell_str(value) for value in last[1:]]):
+            self._conn.execute(f'DELETE FROM {self._table} WHERE id = ?', (last[0],))
+        if not values:
+            self._conn.execute(f'INSERT INTO {self._table} DEFAULT VALUES')
+            return
+        self._ensure_cols(len(values))
+        cols = ', '.join(f'c{col}' for col in range(1, len(values) + 1))
+        marks = ', '.join('?' * len(values))
+        self._conn.execute(
+            f'INSERT INTO {self._table} ({cols}) VALUES ({marks})', [cell_str(value) for value in values]
+        )
+
+    def _clear_row(self, row: int) -> None:
+        row_id = self._row_id(row)
+        if row_id is not None and self._cols:
+            cells = ', '.join(f'c{col} = NULL' for col in range(1, self._cols + 1))
+            self._conn.execute(f'UPDATE {self._table} SET {cells} WHERE id = ?', (row_id,))
+
+    def _delete_row(self, row: int) -> None:
+        row_id = self._row_id(row)
+        if row_id is not None:
+            self._conn.execute(f'DELETE FROM {self._table} WHERE id = ?', (row_id,))
+
+    def _update_headers(self, headers: list[str]) -> None:
+        for col, header in enumerate(headers, start=1):
+            self._update_cell(1, col, header)
+
+    @api_call
+    def get_all_values(self) -> list[list[str]]:
+        return self._values()
+
+    @api_call
+    def row_values(self, row: int) -> list[str]:
+        return self._row_values(row)
+
+    @api_call
+    def get_rows(self, start: int, end: int) -> list[list[str]]:
+        return self._rows_range(start, end)
+
+    @api_call
+    def row_count(self) -> int:
+        return self._conn.execute(f'SELECT COUNT(*) FROM {self._table}').fetchone()[0]
+
+    @api_call
+    def update_cell(self, row: int, col: int, value) -> None:
+        with self._conn:
+            self._update_cell(row, col, value)
+
+    @api_call
+    def append_row(self, values: list) -> None:
+        with self._conn:
+            self._append_row(values)
+
+    @api_call
+    def clear_row(self, row: int) -> None:
+        with self._conn:
+            self._clear_row(row)
+
+    @api_call
+    def delete_row(self, row: int) -> None:
+        with self._conn:
+            self._delete_row(row)
+
+
+class SQLiteStorage:
+    '''
+    `StorageBackend` keeping the worksheets as tables of a local SQLite database.
+
+    :param path: path to the database file
+    '''
+
+    def __init__(self, path: str) -> None:
+        self.api_calls = 0
+        self._conn = sqlite3.connect(path)
+        self._worksheets: dict[str, SQLiteWorksheet] = {}
+
+    @api_call
+    def worksheet_titles(self) -> list[str]:
+        rows = self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        return [name for name, in rows]
+
+    def open_worksheet(self, title: str, headers: list[str], exists: bool) -> SQLiteWorksheet:
+        worksheet = SQLiteWorksheet(self._conn, title, len(headers))
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    @api_call
+    def header_rows(self, titles: list[str]) -> dict[str, list[str]]:
+        return {title: self._worksheets[title]._row_values(1) for title in titles}
+
+    @api_call
+    def update_header_rows(self, headers: dict[str, list[str]]) -> None:
+        with self._conn:
+            for title, row in headers.items():
+                self._worksheets[title]._update_headers(row)
+
+    @api_call
+    def apply_batch(self, ops: list[WriteOp]) -> None:
+        # all the writes are committed in one transaction
+        with self._conn:
+            for op in ops:
+                getattr(op.worksheet, f'_{op.method}')(*op.args)
@@ -1,7 +1,11 @@
 from typing import TypedDict
-from gspread import Worksheet
 from enum import Enum
+from library_system.config import STOCK_BACKEND, BORROWED_BACKEND
 from library_system.models.book import BookFields, BorrowFields
+from library_system.models.storage import StorageKinds, WorksheetBackend
+
+# header of the last column of the worksheets keeping the stable id of each row
+ROW_ID = 'row_id'
 
 
 class WorksheetSet(TypedDict):
@@ -11,30 +15,48 @@ class WorksheetSet(TypedDict):
     from `BookFields` enum or `BorrowFields` enum.
     e.g. ['ISBN', 'Title', 'Author', 'Genre', 'Year', 'Copies']
     e.g. ['isbn', 'title', 'author', 'genre', 'year', 'borrower', 'borrow_date', 'due_date']
-    :param w_sheet: gspread Worksheet instance
+    :param backend: storage backend of the worksheet from `StorageKinds` enum
+    :param w_sheet: `WorksheetBackend` instance
+    :param columns: map of the casefolded header names to the column numbers of the worksheet
+
+    The header row of the worksheet is `fields` followed by the `ROW_ID` column, see `worksheet_headers`.
     '''
     title: str
     fields: list[str]
-    w_sheet: None | Worksheet
+    backend: StorageKinds
+    w_sheet: None | WorksheetBackend
+    columns: dict[str, int]
 
 
 class WorksheetSets(Enum):
     '''
     Enum of `WorksheetSet` instances.
-    Each `WorksheetSet` contains: worksheet `title`, `fields` and `w_sheet`(gspread `Worksheet` instance).
+    Each `WorksheetSet` contains: worksheet `title`, `fields`, `backend`,
+    `w_sheet`(`WorksheetBackend` instance) and `columns` map of the header.
 
-    Example. To get `Worksheet` instance of `stock` google worksheet by title:
+    Example. To get `WorksheetBackend` instance of `stock` worksheet by title:
     use `WorksheetSets.stock.value['w_sheet']`:
         >>> WorksheetSets.stock.value['w_sheet']
-        <Worksheet 'stock' id:0>  # returns Worksheet instance or None
+        <GSheetWorksheet object>  # returns WorksheetBackend instance or None
     '''
     stock = WorksheetSet(
         title='stock',
         fields=list(map(lambda field: field.name, BookFields)),
-        w_sheet=None
+        backend=StorageKinds(STOCK_BACKEND),
+        w_sheet=None,
+        columns={}
     )
     borrowed = WorksheetSet(
         title='borrowed',
         fields=list(map(lambda field: field.name, BorrowFields)),
-        w_sheet=None
+        backend=StorageKinds(BORROWED_BACKEND),
+        w_sheet=None,
+        columns={}
     )
+
+
+def worksheet_headers(w_set: WorksheetSet) -> list[str]:
+    '''
+    Get the header row of the worksheet: the `fields` and the `ROW_ID` column.
+    '''
+    return w_set['fields'] + [ROW_ID]
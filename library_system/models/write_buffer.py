@@ -0,0 +1,68 @@
+'''
+Buffer of the worksheets writes.
+
+The `Library` collects cell updates, appended and deleted rows in a `WriteBuffer`
+and sends them to each storage as one batch request instead of a request per write.
+'''
+import time
+
+from library_system.models.storage import StorageKinds, StorageBackend, WriteOp
+
+
+class WriteBuffer:
+    '''
+    Ordered writes by storage waiting to be flushed.
+
+    :param max_ops: number of buffered writes that triggers a flush
+    :param max_delay: number of seconds the oldest buffered write can wait before a flush is triggered
+    '''
+
+    def __init__(self, max_ops: int, max_delay: float) -> None:
+        self.max_ops = max_ops
+        self.max_delay = max_delay
+        self._ops: dict[StorageKinds, list[WriteOp]] = {}
+        self._first_at: float | None = None
+
+    def __len__(self) -> int:
+        return sum(map(len, self._ops.values()))
+
+    def add(self, kind: StorageKinds, op: WriteOp) -> None:
+        '''
+        Add the write to the buffer of the storage.
+        '''
+        if self._first_at is None:
+            self._first_at = time.monotonic()
+        self._ops.setdefault(kind, []).append(op)
+
+    def is_due(self) -> bool:
+        '''
+        Check if the buffer reached the size or the time threshold.
+        '''
+        if self._first_at is None:
+            return False
+        return len(self) >= self.max_ops or time.monotonic() - self._first_at >= self.max_delay
+
+    def flush(self, storages: dict[StorageKinds, StorageBackend]) -> int:
+        '''
+        Send the buffered writes to their storages, one batch request per storage.
+        The writes of a storage are removed from the buffer only after they are applied.
+
+        :param storages: `StorageBackend` instances by `StorageKinds`
+        :return: number of the flushed writes
+        '''
+        flushed = 0
+        for kind in list(self._ops):
+            ops = self._ops[kind]
+            if ops:
+                storages[kind].apply_batch(ops)
+                flushed += len(ops)
+            del self._ops[kind]
+        self._first_at = None
+        return flushed
+
+    def clear(self) -> None:
+        '''
+        Drop all the buffered writes.
+        '''
+        self._ops.clear()
+        self._first_at = None
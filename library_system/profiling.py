@@ -0,0 +1,71 @@
+'''
+Profiles of the Main Menu operations.
+
+Run `python3 run.py --profile-operations` (or set `PROFILE_OPERATIONS=1`) to run each selected
+`library_manager` entry point (`add_book`, `return_book`, ...) under `cProfile`.
+The profile of each run is saved to the `PROFILE_DIR` directory as `<operation>-<date>-<time>.prof`
+and the top `PROFILE_TOP` functions by cumulative time are printed when the operation is done.
+The time the operation waits for the user input is included, see the `input` and `sleep` rows.
+
+Open the saved profiles with `python -m pstats profiles/<file>.prof` or any `pstats` viewer.
+'''
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from typing import Callable, TypeVar
+
+from library_system.config import PROFILE_DIR, PROFILE_TOP
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def profile_path(name: str, directory: str) -> str:
+    '''
+    Get a new path of the profile file of the operation.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}')
+    path = f'{stem}.prof'
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = f'{stem}-{number}.prof'
+    return path
+
+
+def profile_summary(profile: cProfile.Profile, top: int) -> str:
+    '''
+    Get the text table of the `top` functions by cumulative time.
+    '''
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return stream.getvalue()
+
+
+def profile_operation(
+        func: Callable[..., T], *args, directory: str = PROFILE_DIR, top: int = PROFILE_TOP
+) -> T:
+    '''
+    Run the operation under `cProfile`, save the profile and print its summary,
+    also if the operation fails or exits the app.
+
+    :param func: `library_manager` entry point
+    :param directory: directory of the profile files
+    :param top: number of the functions printed
+    :return: result of the operation
+    '''
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args)
+    finally:
+        path = profile_path(func.__name__, directory)
+        profile.dump_stats(path)
+        logger.info('Saved the profile of <%s> to %s', func.__name__, path)
+        print(f'\nProfile of <{func.__name__}> saved to {path}')
+        print(profile_summary(profile, top))
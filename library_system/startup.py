@@ -0,0 +1,90 @@
+'''
+Startup profile of the app.
+
+Run `python3 run.py --profile-startup` (or set `PROFILE_STARTUP=1`) to print the time of the startup phases
+and the import time by top-level package, instead of running the app.
+The imports are timed by wrapping `builtins.__import__`, the import time of a package is its self time:
+the time spent in the imports of its modules minus the time of the nested imports of the other modules.
+The imports of the background thread opening the Library are included.
+'''
+import builtins
+import sys
+import threading
+import time
+
+
+class StartupProfile:
+    '''
+    Time of the startup phases and of the imports.
+
+    :param `started`: `perf_counter` value when the profile was started.
+    :param `phases`: startup phases names and seconds since the start.
+    :param `imports`: self seconds and number of the loaded modules by top-level package.
+    '''
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self.imports: dict[str, list] = {}
+        self._import = builtins.__import__
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls) -> 'StartupProfile':
+        '''
+        Start timing the imports.
+        '''
+        profile = cls()
+        builtins.__import__ = profile._timed_import
+        return profile
+
+    def stop(self) -> None:
+        '''
+        Stop timing the imports.
+        '''
+        builtins.__import__ = self._import
+
+    def mark(self, phase: str) -> None:
+        '''
+        Record the end of the startup phase.
+        '''
+        self.phases.append((phase, time.perf_counter() - self.started))
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        stack = self._local.__dict__.setdefault('stack', [])
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        stack.append(0.0)
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            nested = stack.pop()
+            elapsed = time.perf_counter() - start
+            if stack:
+                stack[-1] += elapsed
+            new_modules = len(sys.modules) - loaded
+            if new_modules > 0:
+                if level and globals:
+                    # relative import, e.g. `from .book_adder import add_book`
+                    name = globals.get('__package__') or name
+                package = name.partition('.')[0]
+                with self._lock:
+                    package_stats = self.imports.setdefault(package, [0.0, 0])
+                    package_stats[0] += elapsed - nested
+                    package_stats[1] += new_modules
+
+    def report(self, top: int = 15) -> str:
+        '''
+        Get the text report of the phases and of the `top` packages by import time.
+        '''
+        lines = ['Startup phases (seconds since the start of run.py):']
+        lines += [f'  {phase:<24}{seconds:8.3f}' for phase, seconds in self.phases]
+        total = sum(seconds for seconds, _ in self.imports.values())
+        lines.append(f'Import time by package ({total:.3f}s in total):')
+        lines.append(f'  {"package":<24}{"seconds":>8}{"modules":>9}')
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        lines += [
+            f'  {package:<24}{seconds:8.3f}{modules:9d}' for package, (seconds, modules) in ranked[:top]
+        ]
+        return '\n'.join(lines)
@@ -1,10 +1,13 @@
 import os
-import sys
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
 from library_system.config import SHEET_NAME, CREDS_PATH
-from library_system.models.spreadsheet import Library
-from library_system.models.worksheets_cfg import WorksheetSets
+
+if TYPE_CHECKING:
+    # the models are imported on the first use, see `open_library`
+    from library_system.models.spreadsheet import Library
 
 
 logger = logging.getLogger(__name__)
@@ -29,31 +32,95 @@ def clear_terminal():
     os.system('cls' if os.name == 'nt' else "printf '\033c'")
 
 
-def library_init() -> Library:
+def open_library() -> 'Library':
     '''
-    Initialize a Library instance and connect to the Google Sheet.
+    Initialize a Library instance, connect to the Google Sheet
+    if any of the worksheets is stored there and set the worksheets.
+    Nothing is printed, so it can run in a background thread.
 
+    :raise ConnectionError: if the Library can't connect to the Google Sheet
     :return: Library instance
     '''
-    print('Connecting to the Library Spreadsheet...')
+    from library_system.models.spreadsheet import Library
+    from library_system.models.worksheets_cfg import WorksheetSets
+
+    w_sets = list(WorksheetSets)
     library = Library(SHEET_NAME, CREDS_PATH)
-    library.connect()
-    if not library.isConnected:
+    if Library.uses_google_sheets(w_sets):
+        library.connect()
+        if not library.isConnected:
+            raise ConnectionError('Failed to connect to the Library Spreadsheet.')
+        logger.info('Connected to the Library Spreadsheet.')
+    library.set_worksheets(w_sets)
+    return library
+
+
+def open_library_background() -> 'Future[Library]':
+    '''
+    Start `open_library` in a background thread,
+    so the modules are imported and the connection is made while the user reads the main menu.
+    Pass the returned `Future` to `library_init` to get the Library.
+    '''
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='library-init')
+    pending = executor.submit(open_library)
+    executor.shutdown(wait=False)
+    return pending
+
+
+def library_init(pending: 'Future[Library] | None' = None) -> 'Library':
+    '''
+    Initialize a Library instance and connect to the Google Sheet
+    if any of the worksheets is stored there.
+    Exit the app if the connection fails.
+
+    :param pending: `Future` of the Library opened by `open_library_background`,
+    if None the Library is opened now
+    :return: Library instance
+    '''
+    from library_system.models.storage import StorageKinds
+    from library_system.models.worksheets_cfg import WorksheetSets
+
+    uses_google_sheets = any(w_set.value['backend'] == StorageKinds.gsheet for w_set in WorksheetSets)
+    if uses_google_sheets and (pending is None or not pending.done()):
+        print('Connecting to the Library Spreadsheet...')
+    try:
+        library = pending.result() if pending is not None else open_library()
+    except ConnectionError as e:
         print(f'{F.ERROR}Cannot connect to the Library Spreadsheet. Restart the App or try again later.\n'
               f'Exiting...{F.ENDC}')
-        logger.error('Failed to connect to the Library Spreadsheet.')
+        logger.error(e)
         quit()
-    else:
+    if uses_google_sheets:
         print(f'{F.BOLD}Succesfully connected.{F.ENDC}\n')
-        logger.info('Connected to the Library Spreadsheet.')
-        library.set_worksheets(list(WorksheetSets))
     return library
 
 
-def restart_app():
-    """
-    Restarts the current program.
-    """
-    python = sys.executable
-    logger.info('Restarting the app...')
-    os.execv(python, [python] + sys.argv)
+def is_connection_error(error: Exception) -> bool:
+    '''
+    Check if the request failed because of the connection or the authorization,
+    so the Library must be reconnected before the failed option is run again:
+    gspread `APIError` with the 401 or 5xx status, `requests` connection errors and timeouts,
+    token refresh errors.
+    '''
+    import gspread as gs
+    import requests
+    from google.auth.exceptions import RefreshError, TransportError
+
+    if isinstance(error, gs.exceptions.APIError):
+        status = error.response.status_code
+        return status == 401 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, RefreshError, TransportError))
+
+
+def library_reconnect(library: 'Library') -> None:
+    '''
+    Recover the connection of the Library instance in place after a failed request.
+    Exit the app if the Library Spreadsheet can't be reached.
+
+    :param library: Library instance
+    '''
+    if not library.reconnect():
+        print(f'{F.ERROR}Cannot connect to the Library Spreadsheet. Restart the App or try again later.\n'
+              f'Exiting...{F.ENDC}')
+        logger.error('Failed to reconnect to the Library Spreadsheet.')
+        quit()
@@ -0,0 +1,34 @@
+'''
+Banner displayed at the start of the app.
+
+The figlet banner is rendered with `pyfiglet` once and cached in a text file next to this module,
+so the launches don't import `pyfiglet` and render the text again.
+Delete the cached file after changing `BANNER_TEXT` or `BANNER_FONT`.
+'''
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BANNER_TEXT = 'Library Management System'
+BANNER_FONT = 'straight'
+BANNER_PATH = Path(__file__).with_name(f'banner_{BANNER_FONT}.txt')
+
+
+def get_banner() -> str:
+    '''
+    Get the pre-rendered banner, render and cache it if the cached file is missing.
+    '''
+    try:
+        return BANNER_PATH.read_text(encoding='utf-8')
+    except OSError:
+        pass
+
+    from pyfiglet import figlet_format
+
+    banner = figlet_format(BANNER_TEXT, BANNER_FONT)
+    try:
+        BANNER_PATH.write_text(banner, encoding='utf-8')
+    except OSError as e:
+        logger.warning('Failed to cache the banner: %s', e)
+    return banner
@@ -7,10 +7,9 @@ from rich import box, padding as p
 
 from pydantic import ValidationError
 
-from library_system.tools import restart_app
 from library_system.models.book import Book, BookFields, BorrowFields
 from library_system.models.validators import IntInRange, MenuOptions, NonEmptyStr
-from library_system.models.worksheets_cfg import WorksheetSets
+from library_system.models.worksheets_cfg import ROW_ID, WorksheetSets
 from library_system.tools import F
 
 logger = logging.getLogger(__name__)
@@ -56,7 +55,7 @@ class Menu:
             padding: p.PaddingDimensions = (0, 1)):
         '''
         Prints a table based on options list of dictionaries using `rich` library.
-        Set column headers to the keys of the first dictionary in the list.
+        Set column headers to the keys of the first dictionary in the list, except the `ROW_ID` of the books.
         Set row values to the values of the dictionaries in the list.
 
         Default settings: title style - green, title justify - left, column overflow - fold;
@@ -78,12 +77,13 @@ class Menu:
             box=table_format,
             expand=expand,
             padding=padding)
-        headers = options[0].keys()
+        # the row id of the books is kept for the writes, it's not displayed
+        headers = [header for header in options[0] if header != ROW_ID]
         for header in headers:
             table.add_column(header, overflow='fold')
 
         for d in options:
-            table.add_row(*map(str, d.values()))
+            table.add_row(*(str(d.get(header, '')) for header in headers))
 
         console = Console()
         console.width = 90
@@ -170,13 +170,19 @@ class Menu:
         del selected_option['Code']
         return selected_option
 
-    def run(self):
+    def display(self):
         '''
-        Displays the menu and gets user input.
+        Displays the menu without waiting for user input.
         '''
         Menu.print_table(self._numbered_options,
                          self._table_format, self._title,
                          self._expand, self._padding)
+
+    def run(self):
+        '''
+        Displays the menu and gets user input.
+        '''
+        self.display()
         self._get_user_input()
 
 
@@ -202,9 +208,8 @@ def get_book_input(book: Book, field: BookFields | BorrowFields, msg: str | None
         except ValidationError as e:
             print(f"{F.ERROR}{e.errors()[0]['msg']}\nTry again.{F.ENDC}\n")
         except ValueError as e:
-            logging.error(e)
-            print(f"{F.ERROR}Something went wrong. Restarting...{F.ENDC}\n")
-            restart_app()
+            logger.error('Failed to set the book field <%s>: %s', field.name, e)
+            print(f"{F.ERROR}Something went wrong.\nTry again.{F.ENDC}\n")
         else:
             return book[field.name]
 
@@ -44,7 +44,8 @@ class MenuSets(Enum):
                  'Check Out Book',
                  'Return Book',
                  'Check Overdue Borrowers',
-                 'View Library Stocks'],
+                 'View Library Stocks',
+                 'Diagnostics'],
         table_format=box.MINIMAL_DOUBLE_HEAD,
     )
     add_book = MenuSet(
@@ -1,31 +1,39 @@
+import atexit
 import logging
 import sys
-from pyfiglet import figlet_format
+from typing import TYPE_CHECKING
 
-from library_system.config import LOGTAIL_TOKEN
-from library_system.tools import clear_terminal, library_init
-from library_system.models.spreadsheet import Library
-from library_system.views.console_ui import Menu
-from library_system.views.menus import MenuSets
-from library_system import library_manager
+from library_system.config import PROFILE_STARTUP, PROFILE_OPERATIONS, METRICS_FILE, RESTART_RETRIES
+from library_system.startup import StartupProfile
 
-from logtail import LogtailHandler
+# start timing before the app modules are imported
+startup_profile = StartupProfile.start() if PROFILE_STARTUP or '--profile-startup' in sys.argv else None
+# run each selected option under cProfile
+profile_operations = PROFILE_OPERATIONS or '--profile-operations' in sys.argv
 
-# log to Logtail service
-logtail_handler = LogtailHandler(source_token=LOGTAIL_TOKEN)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - [%(filename)s -> %(funcName)s() -> %(lineno)s]: %(message)s",
-    datefmt="%d-%b-%y %H:%M",
-    handlers=[logtail_handler]
+# the modules needed for the main menu only, the models and the library manager
+# are imported by the background thread opening the Library and by `run_selected_option`
+from library_system.tools import (  # noqa: E402
+    F, clear_terminal, library_init, library_reconnect, open_library_background
 )
+from library_system.back_to_menu import Navigation, back_to_menu  # noqa: E402
+from library_system.views.banner import get_banner  # noqa: E402
+from library_system.views.console_ui import Menu  # noqa: E402
+from library_system.views.menus import MenuSets  # noqa: E402
+from library_system.logs import setup_logging  # noqa: E402
+from library_system.models.metrics import metrics  # noqa: E402
+
+if TYPE_CHECKING:
+    from library_system.models.spreadsheet import Library
+
+# ship the logs to Logtail from a background thread
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
 def display_header():
     logger.info('Starting the App...')
-    print(figlet_format('Library Management System', 'straight'))
+    print(get_banner())
 
 
 def run_main_menu():
@@ -41,33 +49,90 @@ def run_main_menu():
     return selected
 
 
-def run_selected_option(library: Library, selected_option: str):
+def run_selected_option(library: 'Library', selected_option: str) -> Navigation:
     '''
     Execute the function using the function name based on the user selection.
     :param library: Library instance
     :param selected_option: selected option name
+    :return: the next step of the menu loop
     '''
+    from library_system import library_manager
+
     func_name = selected_option.replace(' ', '_')
-    try:
-        getattr(library_manager, func_name)(library)
-    except AttributeError:
-        logger.info(f'Invalid option selected: {selected_option}')
+    func = getattr(library_manager, func_name, None)
+    if func is None:
+        logger.info('Invalid option selected: %s', selected_option)
         print(f'Invalid option selected: {selected_option}')
         sys.exit()
+    if profile_operations:
+        from library_system.profiling import profile_operation
+
+        return profile_operation(func, library) or Navigation.main_menu
+    return func(library) or Navigation.main_menu
+
+
+def profile_startup(profile: StartupProfile):
+    '''
+    Run the startup without waiting for user input:
+    display the header and the Main Menu, open the Library and print the startup profile.
+    :param profile: started StartupProfile
+    '''
+    profile.mark('imports')
+    display_header()
+    profile.mark('banner')
+    pending_library = open_library_background()
+    Menu(**MenuSets.main_menu.value).display()
+    profile.mark('main menu')
+    library_init(pending_library)
+    profile.mark('library ready')
+    from library_system import library_manager  # noqa: F401
+    profile.mark('library manager imported')
+    profile.stop()
+    print(profile.report())
 
 
 def main():
     ''''
     Clear terminal screen, display text header;
-    Initialize Library instance, connect to the Google Sheet;
-    Display the Main Menu and process user selection.
+    Initialize Library instance, connect to the Google Sheet in the background while the Main Menu is displayed;
+    Display the Main Menu and process user selection in a loop:
+    the selected option returns to the loop when it's done,
+    so the call stack doesn't grow over a long session.
+    The same Library instance is used for the whole session and reconnected in place after a connection error,
+    the failed option is run again up to `RESTART_RETRIES` times, e.g. a corrupted worksheet fails every time.
     '''
+    if startup_profile is not None:
+        profile_startup(startup_profile)
+        return
+
+    if metrics.enabled:
+        # save the storage calls metrics of the session
+        atexit.register(metrics.dump, METRICS_FILE)
+
     clear_terminal()
     display_header()
 
-    library = library_init()
+    pending_library = open_library_background()
     selected_option = run_main_menu()
-    run_selected_option(library, selected_option)
+    library = library_init(pending_library)
+    restarts = 0
+    while True:
+        library.keep_alive()
+        navigation = run_selected_option(library, selected_option)
+        failed = navigation in (Navigation.restart, Navigation.reconnect)
+        if failed and restarts < RESTART_RETRIES:
+            restarts += 1
+            if navigation == Navigation.reconnect:
+                library_reconnect(library)
+            continue
+        restarts = 0
+        if failed:
+            logger.error('The option <%s> failed again after %s restarts', selected_option, RESTART_RETRIES)
+            print(f'{F.ERROR}The operation failed again. Try again later or restart the App.{F.ENDC}')
+            navigation = Navigation.main_menu
+        if navigation == Navigation.main_menu:
+            back_to_menu()
+            selected_option = run_main_menu()
 
 
 if __name__ == '__main__':